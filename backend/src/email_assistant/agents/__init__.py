@@ -1,12 +1,24 @@
 """Agent utilities for the email assistant."""
-from .classifier import EmailClassifierAgent, EmailClassification
+from .classifier import (
+    ClassificationWithSummary,
+    ClassifyAndMaybeSummarizeAgent,
+    EmailClassifierAgent,
+    EmailClassification,
+)
 from .summarizer import EmailSummarizerAgent
 from .drafter import EmailDrafterAgent, EmailDraft
 from .scheduler import EmailSchedulerAgent, ProposedEvent
 from .preferences import PreferenceExtractionAgent, PreferenceExtraction
-from .conversation import EmailConversationAgent, ConversationReply, ConversationSource
+from .conversation import (
+    EmailConversationAgent,
+    ConversationReply,
+    ConversationSource,
+    ConversationTurn,
+)
 
 __all__ = [
+    "ClassificationWithSummary",
+    "ClassifyAndMaybeSummarizeAgent",
     "EmailClassifierAgent",
     "EmailClassification",
     "EmailSummarizerAgent",
@@ -19,4 +31,5 @@ __all__ = [
     "EmailConversationAgent",
     "ConversationReply",
     "ConversationSource",
+    "ConversationTurn",
 ]
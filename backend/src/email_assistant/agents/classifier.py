@@ -1,17 +1,23 @@
 """Minimal email classification agent built on PydanticAI."""
 from __future__ import annotations
 
-from typing import Any, Dict, Sequence
+import asyncio
+import sys
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Sequence
 
-from pydantic import BaseModel, Field
-from pydantic_ai import Agent
+from pydantic import BaseModel, ConfigDict, Field
 import uuid
-from langfuse import observe
+from ..logging_utils import observe
+
+if TYPE_CHECKING:
+    from pydantic_ai import Agent
 
 from ..business.models import Email
-from .utils import _format_thread
+from ..llm_cache import LLMCache
+from ..storage.semantic_cache import SemanticCache
+from .utils import _format_thread, _get_llm_semaphore, get_shared_agent
 
-INSTRUCTIONS = """
+INSTRUCTIONS = sys.intern("""
 You estimate how an email should be triaged.
 Reply with JSON containing these keys only:
 {
@@ -28,44 +34,172 @@ If the sender is explicitly or implicitly asking for a response from the user, s
 (e.g., “confirmed/booked/scheduled for 2025-10-12 14:00”, “see you at 3pm on Friday”, “invitation attached”). Set low (0–0.1) if the latest email is proposing times, asking availability,
  tentative, rescheduling without a newly confirmed time, lacks a concrete datetime, or only references past events.
 Consider subject, body, sender, recipients, and timing for your reasoning.
-""".strip()
+""".strip())
+
+
+COMBINED_INSTRUCTIONS = sys.intern(
+    INSTRUCTIONS
+    + '\nAdditionally include an optional "summary" key: when needs_summary is 0.5 or higher, '
+    "set it to a concise recap of the thread addressed to the user (as if reading their inbox "
+    "to them); otherwise set it to null."
+)
+
+_PROBABILITY_FIELDS = {"needs_summary", "needs_draft", "needs_schedule"}
 
 
 class EmailClassification(BaseModel):
+    # Instantiated per inbound email and never mutated; frozen instances skip
+    # the per-instance __dict__ bookkeeping for validation on assignment.
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     needs_summary: float = Field(..., ge=0.0, le=1.0)
     needs_draft: float = Field(..., ge=0.0, le=1.0)
     needs_schedule: float = Field(..., ge=0.0, le=1.0)
 
     def as_dict(self) -> Dict[str, float]:
-        return self.model_dump()
+        return self.model_dump(include=_PROBABILITY_FIELDS)
+
+
+class ClassificationWithSummary(EmailClassification):
+    summary: str | None = None
 
 
 class EmailClassifierAgent:
     """Thin wrapper around a PydanticAI agent for email triage."""
 
-    def __init__(self, model: Any, decision_threshold: float = 0.5) -> None:
+    # Subclasses swap these to reuse the caching/streaming machinery with a
+    # different prompt or output model.
+    _CACHE_NAME = "classifier"
+    _AGENT_INSTRUCTIONS = INSTRUCTIONS
+    _OUTPUT_MODEL: type[EmailClassification] = EmailClassification
+
+    def __init__(
+        self,
+        model: Any,
+        decision_threshold: float = 0.5,
+        *,
+        cache: LLMCache | None = None,
+        semantic_cache: SemanticCache | None = None,
+    ) -> None:
         if not 0.0 <= decision_threshold <= 1.0:
             raise ValueError("decision_threshold must be between 0 and 1")
         self._threshold = decision_threshold
-        self._agent = Agent(
-            model=model,
-            instructions=INSTRUCTIONS,
-            output_type=EmailClassification,
-            instrument=True,
-        )
-    
+        self._cache = cache
+        self._semantic_cache = semantic_cache
+        self._model = model
+        self._agent_instance: Agent | None = None
+
+    @property
+    def _agent(self) -> Agent:
+        # Built lazily so processes that never classify skip the schema
+        # compilation and instrumentation setup entirely.
+        if self._agent_instance is None:
+            self._agent_instance = get_shared_agent(
+                self._model,
+                instructions=self._AGENT_INSTRUCTIONS,
+                output_type=self._OUTPUT_MODEL,
+            )
+        return self._agent_instance
+
+    def _cache_lookup(self, prompt: str) -> tuple[str | None, EmailClassification | None]:
+        key: str | None = None
+        if self._cache is not None:
+            key = LLMCache.make_key(self._CACHE_NAME, self._AGENT_INSTRUCTIONS, prompt)
+            cached = self._cache.get(key)
+            if cached is not None:
+                return key, self._OUTPUT_MODEL.model_validate(cached)
+        if self._semantic_cache is not None:
+            cached = self._semantic_cache.lookup(prompt)
+            if cached is not None:
+                return key, self._OUTPUT_MODEL.model_validate(cached)
+        return key, None
+
+    def _cache_store(self, key: str | None, prompt: str, output: EmailClassification) -> None:
+        dumped = output.model_dump()
+        if key is not None:
+            self._cache.set(key, dumped)
+        if self._semantic_cache is not None:
+            self._semantic_cache.store(prompt, dumped)
+
     @observe()
     def classify(self, thread: Sequence[Email]) -> EmailClassification:
-        """Classify an email conversation thread."""
-        return self._agent.run_sync(_format_thread(thread)).output
+        """Classify an email conversation thread.
+
+        Synchronous convenience wrapper; prefer :meth:`classify_async` from
+        async code so the event loop is never blocked.
+        """
+        return asyncio.run(self.classify_async(thread))
 
     @observe()
     async def classify_async(self, thread: Sequence[Email]) -> EmailClassification:
         """Asynchronously classify an email conversation thread."""
-        return (await self._agent.run(_format_thread(thread))).output
+        prompt = _format_thread(thread)
+        key, cached = self._cache_lookup(prompt)
+        if cached is not None:
+            return cached
+        async with _get_llm_semaphore():
+            output = (await self._agent.run(prompt)).output
+        self._cache_store(key, prompt, output)
+        return output
+
+    async def classify_stream_async(
+        self, thread: Sequence[Email]
+    ) -> AsyncIterator[EmailClassification]:
+        """Yield partial classifications as the structured output streams in.
+
+        The final yielded value is the complete classification; callers can act
+        on individual probabilities as soon as they appear instead of waiting
+        for the full response.
+        """
+        prompt = _format_thread(thread)
+        key, cached = self._cache_lookup(prompt)
+        if cached is not None:
+            yield cached
+            return
+        output: EmailClassification | None = None
+        async with _get_llm_semaphore():
+            async with self._agent.run_stream(prompt) as stream:
+                async for partial in stream.stream_output():
+                    output = partial
+                    yield partial
+        if output is not None:
+            self._cache_store(key, prompt, output)
+
+    @observe()
+    async def classify_batch_async(
+        self, threads: Sequence[Sequence[Email]]
+    ) -> list[EmailClassification]:
+        """Classify several threads concurrently; classify_async bounds each call."""
+        return list(await asyncio.gather(*(self.classify_async(thread) for thread in threads)))
+
+    @property
+    def decision_threshold(self) -> float:
+        return self._threshold
 
     def decisions(self, classification: EmailClassification) -> Dict[str, bool]:
-        data = classification.as_dict()
-        return {key: value >= self._threshold for key, value in data.items()}
+        return self.decisions_from_probs(classification.as_dict())
+
+    def decisions_from_probs(self, probabilities: Dict[str, float]) -> Dict[str, bool]:
+        """Threshold an already-materialized probability dict.
+
+        Callers that also need the probabilities (e.g. for the response body)
+        dump the model once and pass the dict here instead of paying the
+        pydantic attribute reads twice.
+        """
+        return {key: value >= self._threshold for key, value in probabilities.items()}
+
+
+class ClassifyAndMaybeSummarizeAgent(EmailClassifierAgent):
+    """Classifier variant that returns the summary in the same response.
+
+    When the model judges a summary worthwhile it writes it into the same
+    structured output, so the summary path costs one forward pass over the
+    thread tokens instead of two. Callers fall back to the dedicated
+    summarizer only when the response omits the text.
+    """
+
+    _CACHE_NAME = "classifier_summarizer"
+    _AGENT_INSTRUCTIONS = COMBINED_INSTRUCTIONS
+    _OUTPUT_MODEL = ClassificationWithSummary
 
 
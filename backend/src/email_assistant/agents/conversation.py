@@ -1,21 +1,28 @@
 from __future__ import annotations
 
+import asyncio
+import os
+import sys
 from typing import Any, Sequence
 
-from pydantic import BaseModel, Field
-from pydantic_ai import Agent
-from langfuse import observe
+import logging
 
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from ..business.models import Email
 from ..storage.db import Database
+from ..storage.semantic_cache import SemanticCache
 from ..storage.vector_store import EmailVectorStore
-from ..logging_utils import logs_handler
+from ..logging_utils import logs_handler, observe
 from .drafter import EmailDrafterAgent, EmailDraft
 from .scheduler import EmailSchedulerAgent, ProposedEvent
 
 logger = logs_handler.get_logger()
 
-INSTRUCTIONS = """
+# Upper bound on tool invocations running concurrently when the LLM returns
+# several tool calls in a single step.
+TOOL_CONCURRENCY_LIMIT = int(os.getenv("TOOL_CONCURRENCY_LIMIT", "4"))
+
+INSTRUCTIONS = sys.intern("""
 You are the conversational front for the email assistant.
 Use the tools provided to look up stored emails, draft replies, or schedule events when helpful.
 
@@ -25,10 +32,29 @@ Available tools:
 - schedule_event(mail_id: str): Produce a calendar event proposal based on the thread identified by mail_id. Call only when the relevant mail_id is confirmed.
 
 If you are unsure about the correct mail_id for a follow-up action, call search_emails first to narrow it down before drafting or scheduling.
-""".strip()
+""".strip())
+
+
+class ConversationTurn(BaseModel):
+    """One chat message, normalized once at validation time."""
+
+    role: str = "user"
+    content: str = ""
+
+    @field_validator("role", mode="before")
+    @classmethod
+    def _normalize_role(cls, value: str | None) -> str:
+        return (value or "user").strip().lower()
+
+    @field_validator("content", mode="before")
+    @classmethod
+    def _normalize_content(cls, value: str | None) -> str:
+        return (value or "").strip()
 
 
 class ConversationSource(BaseModel):
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     mail_id: str = Field(description="Identifier of the email used as a source")
     thread_id: str = Field(description="Thread identifier the email belongs to")
     subject: str | None = Field(default=None, description="Subject line of the email")
@@ -52,141 +78,160 @@ class EmailConversationAgent:
         vector_store: EmailVectorStore,
         drafter: EmailDrafterAgent,
         scheduler: EmailSchedulerAgent,
+        semantic_cache: SemanticCache | None = None,
     ) -> None:
         self._db = database
         self._vector_store = vector_store
         self._drafter = drafter
         self._scheduler = scheduler
+        self._semantic_cache = semantic_cache
+        self._tool_semaphore = asyncio.Semaphore(TOOL_CONCURRENCY_LIMIT)
 
         logger.info("EmailConversationAgent initialized")
 
-        @observe()
-        def search_emails(query: str, limit: int = 5) -> list[dict[str, Any]]:
-            logger.info("Tool search_emails invoked (query='%s', limit=%d)", query, limit)
-            try:
-                records = self._vector_store.search(query, limit)
-            except Exception:
-                logger.exception("Tool search_emails failed for query '%s'", query)
-                raise
-
-            sources: list[ConversationSource] = []
-            for record in records:
-                sources.append(
-                    ConversationSource(
-                        mail_id=record['mail_id'],
-                        thread_id=record['thread_id'],
-                        subject=record.get('subject'),
-                        snippet=record.get('snippet', ''),
-                        score=record.get('score', 0.0),
-                    )
-                )
-            logger.info("Tool search_emails returning %d sources", len(sources))
-            return [source.model_dump() for source in sources]
-
-        @observe()
-        async def draft_reply(mail_id: str) -> dict[str, Any]:
-            logger.info("Tool draft_reply invoked for mail_id=%s", mail_id)
-            try:
-                thread = self._db.fetch_thread_by_mail_id(mail_id)
-            except Exception:
-                logger.exception("Failed to load thread for mail_id=%s", mail_id)
-                raise
-
-            if not thread:
-                logger.warning("draft_reply could not find thread for mail_id=%s", mail_id)
-                return {"status": "not_found", "mail_id": mail_id}
-
-            logger.info("Loaded thread with %d emails for mail_id=%s", len(thread), mail_id)
-
-            try:
-                draft = await self._drafter.draft_async(thread)
-            except Exception:
-                logger.exception("Drafting failed for mail_id=%s", mail_id)
-                raise
-
-            latest_email: Email = thread[-1]
-            logger.info("Draft ready for mail_id=%s thread_id=%s", mail_id, latest_email.thread_id)
-            return {
-                "status": "ok",
-                "mail_id": mail_id,
-                "thread_id": latest_email.thread_id,
-                "draft": draft.model_dump(),
+        # Bound methods carry no per-instance closure allocation; the Agent and
+        # its tool schemas are built exactly once per agent lifetime. The
+        # import is deferred so non-chat entry points never load pydantic_ai.
+        from pydantic_ai import Agent
+
+        self._agent = Agent(
+            model=model,
+            instructions=INSTRUCTIONS,
+            output_type=ConversationReply,
+            instrument=True,
+            tools=[self.search_emails, self.draft_reply, self.schedule_event],
+        )
+
+    @observe()
+    async def search_emails(self, query: str, limit: int = 5) -> list[dict[str, Any]]:
+        logger.info("Tool search_emails invoked (query='%s', limit=%d)", query, limit)
+        if self._semantic_cache is not None:
+            cached = self._semantic_cache.lookup(query)
+            if cached is not None:
+                logger.info("Tool search_emails served %d sources from semantic cache", len(cached))
+                return cached
+        try:
+            async with self._tool_semaphore:
+                records = await asyncio.to_thread(self._vector_store.search, query, limit)
+        except Exception:
+            logger.exception("Tool search_emails failed for query '%s'", query)
+            raise
+
+        # The records are already plain dicts; project the tool-facing fields
+        # directly instead of validating through ConversationSource and dumping
+        # back out. ConversationSource still guards the final reply model.
+        dumped = [
+            {
+                "mail_id": record["mail_id"],
+                "thread_id": record["thread_id"],
+                "subject": record.get("subject"),
+                "snippet": record.get("snippet", ""),
+                "score": record.get("score", 0.0),
             }
+            for record in records
+        ]
+        logger.info("Tool search_emails returning %d sources", len(dumped))
+        if self._semantic_cache is not None:
+            self._semantic_cache.store(query, dumped)
+        return dumped
+
+    @observe()
+    async def draft_reply(self, mail_id: str) -> dict[str, Any]:
+        logger.info("Tool draft_reply invoked for mail_id=%s", mail_id)
+        try:
+            thread = await asyncio.to_thread(self._db.fetch_thread_by_mail_id, mail_id)
+        except Exception:
+            logger.exception("Failed to load thread for mail_id=%s", mail_id)
+            raise
 
-        draft_reply.__name__ = "draft_reply"
+        if not thread:
+            logger.warning("draft_reply could not find thread for mail_id=%s", mail_id)
+            return {"status": "not_found", "mail_id": mail_id}
 
-        @observe()
-        async def schedule_event(mail_id: str) -> dict[str, Any]:
-            logger.info("Tool scheduler.propose_event invoked for mail_id=%s", mail_id)
-            try:
-                thread = self._db.fetch_thread_by_mail_id(mail_id)
-            except Exception:
-                logger.exception("Failed to load thread for mail_id=%s during scheduling", mail_id)
-                raise
+        logger.info("Loaded thread with %d emails for mail_id=%s", len(thread), mail_id)
 
-            if not thread:
-                logger.warning("scheduler.propose_event could not find thread for mail_id=%s", mail_id)
-                return {"status": "not_found", "mail_id": mail_id}
+        try:
+            async with self._tool_semaphore:
+                draft = await self._drafter.draft_async(thread)
+        except Exception:
+            logger.exception("Drafting failed for mail_id=%s", mail_id)
+            raise
 
-            logger.info("Loaded thread with %d emails for scheduling mail_id=%s", len(thread), mail_id)
+        latest_email: Email = thread[-1]
+        logger.info("Draft ready for mail_id=%s thread_id=%s", mail_id, latest_email.thread_id)
+        return {
+            "status": "ok",
+            "mail_id": mail_id,
+            "thread_id": latest_email.thread_id,
+            "draft": draft.model_dump(),
+        }
 
-            try:
-                event = await self._scheduler.propose_event_async(thread)
-            except Exception:
-                logger.exception("Scheduling failed for mail_id=%s", mail_id)
-                raise
-
-            latest_email: Email = thread[-1]
-            logger.info("Proposed event ready for mail_id=%s thread_id=%s", mail_id, latest_email.thread_id)
-            return {
-                "status": "ok",
-                "mail_id": mail_id,
-                "thread_id": latest_email.thread_id,
-                "event": event.model_dump(),
-            }
+    @observe()
+    async def schedule_event(self, mail_id: str) -> dict[str, Any]:
+        logger.info("Tool scheduler.propose_event invoked for mail_id=%s", mail_id)
+        try:
+            thread = await asyncio.to_thread(self._db.fetch_thread_by_mail_id, mail_id)
+        except Exception:
+            logger.exception("Failed to load thread for mail_id=%s during scheduling", mail_id)
+            raise
 
-        schedule_event.__name__ = "schedule_event"
+        if not thread:
+            logger.warning("scheduler.propose_event could not find thread for mail_id=%s", mail_id)
+            return {"status": "not_found", "mail_id": mail_id}
 
-        self._agent = Agent(
-            model=model,
-            instructions=INSTRUCTIONS,
-            output_type=ConversationReply,
-            instrument=True,
-            tools=[search_emails, draft_reply, schedule_event],
-        )
+        logger.info("Loaded thread with %d emails for scheduling mail_id=%s", len(thread), mail_id)
 
-    def _format_messages(self, messages: Sequence[dict[str, str]]) -> str:
-        logger.debug("Formatting %d messages for conversation prompt", len(messages))
-        lines: list[str] = []
-        for message in messages:
-            role = (message.get("role") or "user").strip().lower()
-            content = (message.get("content") or "").strip()
-            if not content:
-                continue
-            lines.append(f"{role}: {content}")
+        try:
+            async with self._tool_semaphore:
+                event = await self._scheduler.propose_event_async(thread)
+        except Exception:
+            logger.exception("Scheduling failed for mail_id=%s", mail_id)
+            raise
+
+        latest_email: Email = thread[-1]
+        logger.info("Proposed event ready for mail_id=%s thread_id=%s", mail_id, latest_email.thread_id)
+        return {
+            "status": "ok",
+            "mail_id": mail_id,
+            "thread_id": latest_email.thread_id,
+            "event": event.model_dump(),
+        }
+
+    def _format_messages(self, turns: Sequence[ConversationTurn]) -> str:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Formatting %d messages for conversation prompt", len(turns))
+        # Turns are normalized once at parse time, so this is a pure join.
+        lines = [f"{turn.role}: {turn.content}" for turn in turns if turn.content]
         if not lines:
             logger.error("No non-empty messages provided to EmailConversationAgent")
             raise ValueError("At least one non-empty message is required")
-        formatted_prompt = "\n".join(lines)
-        logger.debug("Prompt built with %d lines", len(lines))
-        return formatted_prompt
+        return "\n".join(lines)
 
     @observe()
-    async def respond_async(self, messages: Sequence[dict[str, str]]) -> ConversationReply:
+    async def respond_async(
+        self, messages: Sequence[ConversationTurn | dict[str, str]]
+    ) -> ConversationReply:
         logger.info("respond_async invoked with %d message(s)", len(messages))
-        prompt = self._format_messages(messages)
+        turns = [
+            message if isinstance(message, ConversationTurn) else ConversationTurn.model_validate(message)
+            for message in messages
+        ]
+        prompt = self._format_messages(turns)
         try:
             result = await self._agent.run(prompt)
         except Exception:
             logger.exception("Conversation agent run_async failed")
             raise
         output = result.output
-        logger.info(
-            "respond_async completed (answer_chars=%d, references=%d, draft=%s, event=%s)",
-            len(output.answer or ""),
-            len(output.references),
-            bool(output.draft),
-            bool(output.event),
-        )
+        if logger.isEnabledFor(logging.INFO):
+            # The argument computations themselves are not free; skip them
+            # entirely when INFO records are suppressed.
+            logger.info(
+                "respond_async completed (answer_chars=%d, references=%d, draft=%s, event=%s)",
+                len(output.answer or ""),
+                len(output.references),
+                bool(output.draft),
+                bool(output.event),
+            )
         return output
 
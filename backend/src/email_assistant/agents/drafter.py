@@ -1,16 +1,22 @@
 """Email draft generation agent built on PydanticAI."""
 from __future__ import annotations
+import asyncio
+import functools
 import os
-from typing import Any, Sequence
+import sys
+from typing import TYPE_CHECKING, Any, Sequence
 
 from pydantic import BaseModel, Field
-from pydantic_ai import Agent
-from langfuse import observe
+from ..logging_utils import observe
+
+if TYPE_CHECKING:
+    from pydantic_ai import Agent
 
 from ..business.models import DraftingPreferences, Email
-from .utils import _format_thread
+from ..llm_cache import LLMCache
+from .utils import _format_thread, _get_llm_semaphore, get_shared_agent
 
-INSTRUCTIONS = """
+INSTRUCTIONS = sys.intern("""
 You write helpful reply drafts for incoming emails. Do not add placeholders or extra comments, your draft will be sent directly.
 Assume the last message in the thread is the one that needs a response.
 If a "User writing preferences" section is provided, incorporate every preference faithfully.
@@ -21,12 +27,20 @@ Reply with JSON containing only these keys:
   "body": body text of the reply email
 }
 Keep the tone polite and concise unless instructed otherwise by the preferences.
-""".strip()
+""".strip())
 
 USER_NAME = os.getenv("USER_NAME", "Adrian")
 USER_EMAIL = os.getenv("USER_EMAIL", "example@example.com")
 
 
+@functools.lru_cache(maxsize=128)
+def _format_preferences_block(preference_lines: tuple[str, ...]) -> str:
+    # Keyed on the rendered lines (DraftingPreferences itself is mutable, so
+    # the object is not a usable cache key); redrafts with unchanged
+    # preferences reuse the joined block.
+    return "\n".join(f"- {line}" for line in preference_lines)
+
+
 def _build_agent_input(
     thread: Sequence[Email],
     preferences: DraftingPreferences | None,
@@ -40,7 +54,7 @@ def _build_agent_input(
     if not preference_lines:
         return f"{thread_block}\n{user_info}"
 
-    preferences_block = "\n".join(f"- {line}" for line in preference_lines)
+    preferences_block = _format_preferences_block(tuple(preference_lines))
     return f"{thread_block}\n\nUser writing preferences:\n{preferences_block}\n{user_info}"
 
 
@@ -53,13 +67,29 @@ class EmailDraft(BaseModel):
 class EmailDrafterAgent:
     """Wraps a PydanticAI agent that produces reply drafts."""
 
-    def __init__(self, model: Any) -> None:
-        self._agent = Agent(
-            model=model,
-            instructions=INSTRUCTIONS,
-            output_type=EmailDraft,
-            instrument=True,
-        )
+    def __init__(self, model: Any, *, cache: LLMCache | None = None) -> None:
+        self._cache = cache
+        self._model = model
+        self._agent_instance: Agent | None = None
+
+    @property
+    def _agent(self) -> Agent:
+        if self._agent_instance is None:
+            self._agent_instance = get_shared_agent(
+                self._model,
+                instructions=INSTRUCTIONS,
+                output_type=EmailDraft,
+            )
+        return self._agent_instance
+
+    def _cache_lookup(self, prompt: str) -> tuple[str | None, EmailDraft | None]:
+        if self._cache is None:
+            return None, None
+        key = LLMCache.make_key("drafter", INSTRUCTIONS, prompt)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return key, EmailDraft.model_validate(cached)
+        return key, None
 
     @observe()
     def draft(
@@ -69,7 +99,13 @@ class EmailDrafterAgent:
         preferences: DraftingPreferences | None = None,
     ) -> EmailDraft:
         prompt = _build_agent_input(thread, preferences)
-        return self._agent.run_sync(prompt).output
+        key, cached = self._cache_lookup(prompt)
+        if cached is not None:
+            return cached
+        output = self._agent.run_sync(prompt).output
+        if key is not None:
+            self._cache.set(key, output.model_dump())
+        return output
 
     @observe()
     async def draft_async(
@@ -79,4 +115,30 @@ class EmailDrafterAgent:
         preferences: DraftingPreferences | None = None,
     ) -> EmailDraft:
         prompt = _build_agent_input(thread, preferences)
-        return (await self._agent.run(prompt)).output
+        key, cached = self._cache_lookup(prompt)
+        if cached is not None:
+            return cached
+        async with _get_llm_semaphore():
+            output = (await self._agent.run(prompt)).output
+        if key is not None:
+            self._cache.set(key, output.model_dump())
+        return output
+
+    @observe()
+    async def draft_batch_async(
+        self,
+        threads: Sequence[Sequence[Email]],
+        *,
+        preferences: DraftingPreferences | None = None,
+    ) -> list[EmailDraft]:
+        """Draft replies for several threads concurrently; draft_async bounds each call."""
+        return list(
+            await asyncio.gather(
+                *(self.draft_async(thread, preferences=preferences) for thread in threads)
+            )
+        )
+
+
+# Build the validation core schema at import time so the first LLM response
+# does not pay the lazy-compilation cost.
+EmailDraft.model_rebuild()
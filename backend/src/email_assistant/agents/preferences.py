@@ -1,15 +1,26 @@
 """Preference extraction agent to derive reusable writing preferences."""
 from __future__ import annotations
 
+import asyncio
+import sys
+import hashlib
 import json
-from typing import Any, Dict
+from collections import OrderedDict
+from typing import Any, Dict, Sequence, Tuple
 
-from pydantic import BaseModel
-from pydantic_ai import Agent
-from langfuse import observe
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
 
+from pydantic import BaseModel, ConfigDict
+from ..logging_utils import observe
 
-DEFAULT_INSTRUCTIONS = """
+from ..llm_cache import LLMCache
+from .utils import _get_llm_semaphore, get_shared_agent
+
+
+DEFAULT_INSTRUCTIONS = sys.intern("""
 You analyse how a user modified an email draft suggested by another agent.
 Return structured JSON with any inferred preferences for future drafts to the
 same recipient. Only include a field when you can clearly infer a preference.
@@ -19,10 +30,33 @@ Fields:
 - signature: preferred closing signature (e.g. "Best", "Thanks, Priya")
 - length: short description of desired length (e.g. "concise", "detailed")
 - extra_field: free-form notes for other reusable patterns
-""".strip()
+""".strip())
+
+
+# Users often repeat the same edit (e.g. always swapping the greeting); the
+# memo returns the previous extraction for an identical payload diff without
+# another LLM round-trip.
+EXTRACTION_MEMO_SIZE = 512
+
+
+def _payload_pair_key(original: Dict[str, Any], updated: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        canonical = orjson.dumps([original, updated], option=orjson.OPT_SORT_KEYS)
+    else:
+        canonical = json.dumps([original, updated], sort_keys=True).encode()
+    return hashlib.blake2b(canonical, digest_size=16).digest()
+
+
+def _dumps_pretty_sorted(payload: Dict[str, Any]) -> str:
+    """Serialize a payload for prompt display, via orjson's C path when available."""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS | orjson.OPT_INDENT_2).decode()
+    return json.dumps(payload, indent=2, sort_keys=True)
 
 
 class PreferenceExtraction(BaseModel):
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     tone: str | None = None
     greeting: str | None = None
     signature: str | None = None
@@ -33,29 +67,98 @@ class PreferenceExtraction(BaseModel):
 class PreferenceExtractionAgent:
     """LLM wrapper that derives writing preferences from structured context."""
 
-    def __init__(self, model: Any, *, instructions: str = DEFAULT_INSTRUCTIONS) -> None:
-        self._agent = Agent(
-            model=model,
+    def __init__(
+        self,
+        model: Any,
+        *,
+        instructions: str = DEFAULT_INSTRUCTIONS,
+        cache: LLMCache | None = None,
+    ) -> None:
+        self._instructions = instructions
+        self._cache = cache
+        # PreferenceExtraction is frozen, so memoized instances are shareable.
+        self._memo: OrderedDict[bytes, PreferenceExtraction] = OrderedDict()
+        self._agent = get_shared_agent(
+            model,
             instructions=instructions,
             output_type=PreferenceExtraction,
-            instrument=True,
         )
 
+    def _memo_get(self, key: bytes) -> PreferenceExtraction | None:
+        cached = self._memo.get(key)
+        if cached is not None:
+            self._memo.move_to_end(key)
+        return cached
+
+    def _memo_set(self, key: bytes, value: PreferenceExtraction) -> None:
+        self._memo[key] = value
+        self._memo.move_to_end(key)
+        while len(self._memo) > EXTRACTION_MEMO_SIZE:
+            self._memo.popitem(last=False)
+
     @observe()
     def extract(self, *, original_payload: Dict[str, Any], updated_payload: Dict[str, Any]) -> PreferenceExtraction:
+        key = _payload_pair_key(original_payload, updated_payload)
+        cached = self._memo_get(key)
+        if cached is not None:
+            return cached
         prompt = self._build_prompt(original_payload=original_payload, updated_payload=updated_payload)
-        return self._run(prompt)
+        output = self._run(prompt)
+        self._memo_set(key, output)
+        return output
+
+    @observe()
+    async def extract_batch_async(
+        self, payload_pairs: Sequence[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> list[PreferenceExtraction]:
+        """Extract preferences for several (original, updated) payload pairs concurrently."""
+
+        async def _one(original: Dict[str, Any], updated: Dict[str, Any]) -> PreferenceExtraction:
+            key = _payload_pair_key(original, updated)
+            cached = self._memo_get(key)
+            if cached is not None:
+                return cached
+            prompt = self._build_prompt(original_payload=original, updated_payload=updated)
+            output = await self._run_async(prompt)
+            self._memo_set(key, output)
+            return output
+
+        return list(
+            await asyncio.gather(*(_one(original, updated) for original, updated in payload_pairs))
+        )
 
     def run_prompt(self, prompt: str) -> PreferenceExtraction:
         """Run the underlying agent against a pre-built prompt."""
         return self._run(prompt)
 
     def _run(self, prompt: str) -> PreferenceExtraction:
-        return self._agent.run_sync(prompt).output
+        key: str | None = None
+        if self._cache is not None:
+            key = LLMCache.make_key("preference_extractor", self._instructions, prompt)
+            cached = self._cache.get(key)
+            if cached is not None:
+                return PreferenceExtraction.model_validate(cached)
+        output = self._agent.run_sync(prompt).output
+        if key is not None:
+            self._cache.set(key, output.model_dump())
+        return output
+
+    async def _run_async(self, prompt: str) -> PreferenceExtraction:
+        key: str | None = None
+        if self._cache is not None:
+            key = LLMCache.make_key("preference_extractor", self._instructions, prompt)
+            cached = self._cache.get(key)
+            if cached is not None:
+                return PreferenceExtraction.model_validate(cached)
+        async with _get_llm_semaphore():
+            output = (await self._agent.run(prompt)).output
+        if key is not None:
+            self._cache.set(key, output.model_dump())
+        return output
 
     def _build_prompt(self, *, original_payload: Dict[str, Any], updated_payload: Dict[str, Any]) -> str:
-        formatted_original = json.dumps(original_payload, indent=2, sort_keys=True)
-        formatted_updated = json.dumps(updated_payload, indent=2, sort_keys=True)
+        formatted_original = _dumps_pretty_sorted(original_payload)
+        formatted_updated = _dumps_pretty_sorted(updated_payload)
         return (
             "The model draft was modified by the user.\n"
             "Original model draft (JSON):\n"
@@ -64,3 +167,8 @@ class PreferenceExtractionAgent:
             f"{formatted_updated}\n\n"
             "Identify reusable preferences gleaned from the user's edits."
         )
+
+
+# Build the validation core schema at import time so the first LLM response
+# does not pay the lazy-compilation cost.
+PreferenceExtraction.model_rebuild()
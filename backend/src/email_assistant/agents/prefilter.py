@@ -0,0 +1,32 @@
+"""Cheap local prefilter that spots emails not worth an LLM call."""
+from __future__ import annotations
+
+import re
+
+from ..business.models import Email
+
+# One-liner acknowledgements that need no summary, reply or scheduling.
+TRIVIAL_RE = re.compile(
+    r"^\s*(thanks?( you)?|thank you|thx|ok(ay)?|got it|received|noted|"
+    r"sounds good|see you( there| then)?|cheers|perfect|great)[.!]*\s*$",
+    re.IGNORECASE,
+)
+
+# Subjects typical of automated traffic (the Email model carries no raw
+# headers, so Auto-Submitted and friends are approximated by subject).
+AUTO_SUBJECT_RE = re.compile(
+    r"^(automatic reply|auto[- ]?reply|out of office|delivery status notification|"
+    r"undeliverable|read receipt|mail delivery)",
+    re.IGNORECASE,
+)
+
+
+def is_trivial(email: Email) -> bool:
+    """Return True when an email is obviously not actionable.
+
+    A compute-free short-circuit run before any network I/O; keeping it
+    conservative means a False here only costs the usual classifier call.
+    """
+    if email.subject and AUTO_SUBJECT_RE.match(email.subject.strip()):
+        return True
+    return bool(email.body) and TRIVIAL_RE.match(email.body) is not None
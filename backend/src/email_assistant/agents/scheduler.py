@@ -1,16 +1,18 @@
 """Email scheduling agent built on PydanticAI."""
 from __future__ import annotations
 
+import asyncio
+import sys
 from typing import Any, Sequence
 
 from pydantic import BaseModel, Field
-from pydantic_ai import Agent
-from langfuse import observe
+from ..logging_utils import observe
 
 from ..business.models import Email
-from .utils import _format_thread
+from ..llm_cache import LLMCache
+from .utils import _format_thread, _get_llm_semaphore, get_shared_agent
 
-INSTRUCTIONS = """
+INSTRUCTIONS = sys.intern("""
 You help schedule follow-up meetings or tasks triggered by incoming emails.
 Review the entire thread to understand context.
 Reply with JSON using only these keys:
@@ -20,7 +22,7 @@ Reply with JSON using only these keys:
   "notes": optional string with additional context or next steps
 }
 If timing is unclear, suggest a reasonable default and explain in notes.
-""".strip()
+""".strip())
 
 
 class ProposedEvent(BaseModel):
@@ -32,16 +34,56 @@ class ProposedEvent(BaseModel):
 class EmailSchedulerAgent:
     """Wraps a PydanticAI agent that proposes calendar events."""
 
-    def __init__(self, model: Any) -> None:
-        self._agent = Agent(
-            model=model,
+    def __init__(self, model: Any, *, cache: LLMCache | None = None) -> None:
+        self._cache = cache
+        self._agent = get_shared_agent(
+            model,
             instructions=INSTRUCTIONS,
             output_type=ProposedEvent,
-            instrument=True,
         )
+
+    def _cache_lookup(self, prompt: str) -> tuple[str | None, ProposedEvent | None]:
+        if self._cache is None:
+            return None, None
+        key = LLMCache.make_key("scheduler", INSTRUCTIONS, prompt)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return key, ProposedEvent.model_validate(cached)
+        return key, None
+
     @observe()
     def propose_event(self, thread: Sequence[Email]) -> ProposedEvent:
-        return self._agent.run_sync(_format_thread(thread)).output
+        prompt = _format_thread(thread)
+        key, cached = self._cache_lookup(prompt)
+        if cached is not None:
+            return cached
+        output = self._agent.run_sync(prompt).output
+        if key is not None:
+            self._cache.set(key, output.model_dump())
+        return output
+
     @observe()
     async def propose_event_async(self, thread: Sequence[Email]) -> ProposedEvent:
-        return (await self._agent.run(_format_thread(thread))).output
+        prompt = _format_thread(thread)
+        key, cached = self._cache_lookup(prompt)
+        if cached is not None:
+            return cached
+        async with _get_llm_semaphore():
+            output = (await self._agent.run(prompt)).output
+        if key is not None:
+            self._cache.set(key, output.model_dump())
+        return output
+
+    @observe()
+    async def propose_event_batch_async(
+        self, threads: Sequence[Sequence[Email]]
+    ) -> list[ProposedEvent]:
+        """Propose events for several threads concurrently; propose_event_async bounds each call."""
+        return list(
+            await asyncio.gather(*(self.propose_event_async(thread) for thread in threads))
+        )
+
+
+# Build the validation core schema at import time so the first LLM response
+# does not pay the lazy-compilation cost.
+ProposedEvent.model_rebuild()
@@ -1,19 +1,26 @@
-from typing import Any, Sequence
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any, Sequence
 import os
+import sys
 
 from pydantic import BaseModel, Field
-from pydantic_ai import Agent
-from langfuse import observe
+from ..logging_utils import observe
+
+if TYPE_CHECKING:
+    from pydantic_ai import Agent
 
 from ..business.models import Email
-from .utils import _format_thread
+from ..llm_cache import LLMCache
+from .utils import _format_thread, _get_llm_semaphore, get_shared_agent
 
-INSTRUCTIONS = """
+INSTRUCTIONS = sys.intern("""
 You're an email summarizer. You'll receive an email or thread of emails. 
 Summarize the information to the email receiver.
 Consider subject, body, sender, recipients, and timing for your reasoning.
 Address the user as if you were reading the summary of their email inbox to them.
-""".strip()
+""".strip())
 
 USER_NAME = os.getenv("USER_NAME", "Adrian")
 USER_EMAIL = os.getenv("USER_EMAIL", "example@example.com")
@@ -23,22 +30,54 @@ class EmailSummary(BaseModel):
 
 
 class EmailSummarizerAgent:
-    def __init__(self, model: Any) -> None:
-        self._agent = Agent(
-            model=model,
-            instructions=INSTRUCTIONS,
-            output_type=EmailSummary,
-            instrument=True,
-        )
-    
+    def __init__(self, model: Any, *, cache: LLMCache | None = None) -> None:
+        self._cache = cache
+        self._model = model
+        self._agent_instance: Agent | None = None
+
+    @property
+    def _agent(self) -> Agent:
+        if self._agent_instance is None:
+            self._agent_instance = get_shared_agent(
+                self._model,
+                instructions=INSTRUCTIONS,
+                output_type=EmailSummary,
+            )
+        return self._agent_instance
+
     # Ensure the summarizer knows who the user is in the conversation
     def _build_input_with_user_info(self, thread) -> str:
         thread_str = _format_thread(thread)
         return f"{thread_str}\n\nUser's data:\nName: {USER_NAME}\nEmail: {USER_EMAIL}"
 
+    def _cache_lookup(self, prompt: str) -> tuple[str | None, EmailSummary | None]:
+        if self._cache is None:
+            return None, None
+        key = LLMCache.make_key("summarizer", INSTRUCTIONS, prompt)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return key, EmailSummary.model_validate(cached)
+        return key, None
+
     @observe()
     def summarize(self, thread: Sequence[Email]) -> EmailSummary:
-        return self._agent.run_sync(self._build_input_with_user_info(thread)).output
+        """Synchronous convenience wrapper; prefer summarize_async from async code."""
+        return asyncio.run(self.summarize_async(thread))
     @observe()
     async def summarize_async(self, thread: Sequence[Email]) -> EmailSummary:
-        return (await self._agent.run(self._build_input_with_user_info(thread))).output
+        prompt = self._build_input_with_user_info(thread)
+        key, cached = self._cache_lookup(prompt)
+        if cached is not None:
+            return cached
+        async with _get_llm_semaphore():
+            output = (await self._agent.run(prompt)).output
+        if key is not None:
+            self._cache.set(key, output.model_dump())
+        return output
+
+    @observe()
+    async def summarize_batch_async(
+        self, threads: Sequence[Sequence[Email]]
+    ) -> list[EmailSummary]:
+        """Summarize several threads concurrently; summarize_async bounds each call."""
+        return list(await asyncio.gather(*(self.summarize_async(thread) for thread in threads)))
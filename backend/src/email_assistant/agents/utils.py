@@ -1,31 +1,120 @@
-from typing import Sequence
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+from typing import TYPE_CHECKING, Any, Dict, Sequence
 
 from ..business.models import Email
 
+if TYPE_CHECKING:
+    from pydantic_ai import Agent
+
+# Cap on concurrent in-flight LLM requests across every agent, so N inbound
+# emails cannot fan out into 3N provider calls and trip 429 retry storms.
+LLM_CONCURRENCY_LIMIT = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+
+_llm_semaphore: asyncio.Semaphore | None = None
+
+
+def _get_llm_semaphore() -> asyncio.Semaphore:
+    global _llm_semaphore
+    if _llm_semaphore is None:
+        _llm_semaphore = asyncio.Semaphore(LLM_CONCURRENCY_LIMIT)
+    return _llm_semaphore
+
+
+# The tool-less agents are stateless per (model, instructions, output_type),
+# so two wrappers over the same model can share one Agent and pay for the
+# instruction parsing and output-schema compilation once per process. Keyed
+# by id(model): the cached Agent holds a reference to its model, so an id
+# cannot be recycled while its entry is alive.
+_agent_cache: Dict[tuple, "Agent"] = {}
+
+
+def get_shared_agent(
+    model: Any,
+    *,
+    instructions: str,
+    output_type: type,
+    instrument: bool = True,
+) -> Agent:
+    # Imported here (not at module load) so DB/CLI-only entry points that
+    # never run an agent skip the pydantic_ai import cost entirely.
+    from pydantic_ai import Agent
+
+    key = (id(model), instructions, output_type, instrument)
+    agent = _agent_cache.get(key)
+    if agent is None:
+        agent = Agent(
+            model=model,
+            instructions=instructions,
+            output_type=output_type,
+            instrument=instrument,
+        )
+        _agent_cache[key] = agent
+    return agent
+
+
+# Request-scoped memo for formatted threads: classifier, summarizer, drafter,
+# and scheduler all format the same thread while one email is processed.
+_thread_format_cache: contextvars.ContextVar[dict | None] = contextvars.ContextVar(
+    "thread_format_cache", default=None
+)
+
+
+def enable_thread_format_cache() -> contextvars.Token:
+    """Bind a fresh per-request cache; returns a token for :func:`disable_thread_format_cache`."""
+    return _thread_format_cache.set({})
+
+
+def disable_thread_format_cache(token: contextvars.Token) -> None:
+    _thread_format_cache.reset(token)
+
 
 def _format_single_email(email: Email) -> str:
-    to_addresses = ", ".join(email.to) if email.to else "(not provided)"
-    cc_addresses = ", ".join(email.cc) if email.cc else "(none)"
-    subject = email.subject or "(no subject)"
-    sender = f"{email.from_name} <{email.from_email}>" if email.from_name else email.from_email
-    received_at = email.received_at.isoformat()
+    # Hoist attribute lookups once; the whole block is a single f-string so the
+    # interpreter allocates one result string instead of chained temporaries.
+    to_addresses = email.to
+    cc_addresses = email.cc
+    from_name = email.from_name
+    from_email = email.from_email
     return (
-        f"From: {sender}\n"
-        f"To: {to_addresses}\n"
-        f"Cc: {cc_addresses}\n"
-        f"Subject: {subject}\n"
-        f"Received: {received_at}\n"
+        f"From: {f'{from_name} <{from_email}>' if from_name else from_email}\n"
+        f"To: {', '.join(to_addresses) if to_addresses else '(not provided)'}\n"
+        f"Cc: {', '.join(cc_addresses) if cc_addresses else '(none)'}\n"
+        f"Subject: {email.subject or '(no subject)'}\n"
+        f"Received: {email.received_at.isoformat()}\n"
         f"Body:\n{email.body}\n"
     )
 
+
 def _format_thread(emails: Sequence[Email]) -> str:
     if not emails:
         return "No emails were provided in this thread.\n"
 
     total = len(emails)
-    parts = []
-    for index, email in enumerate(emails, start=1):
-        label = "Latest message" if total > 1 and index == total else f"Message {index}"
-        parts.append(f"--- {label} ---\n" + _format_single_email(email))
+    cache = _thread_format_cache.get()
+    key = (total, emails[-1].mail_id)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    if total == 1:
+        # Fresh emails dominate the traffic; a lone message needs no label,
+        # loop, or join.
+        formatted = f"--- Message 1 ---\n{_format_single_email(emails[0])}"
+    else:
+        # The last element is the only one with a different label, so handle
+        # it outside the loop instead of branching per iteration.
+        parts = [
+            f"--- Message {index} ---\n{_format_single_email(email)}"
+            for index, email in enumerate(emails[:-1], start=1)
+        ]
+        parts.append(f"--- Latest message ---\n{_format_single_email(emails[-1])}")
+        formatted = "\n\n".join(parts)
 
-    return "\n\n".join(parts)
+    if cache is not None:
+        cache[key] = formatted
+    return formatted
@@ -1,19 +1,20 @@
 from __future__ import annotations
 
 import asyncio
-import copy
 import os
-from typing import Annotated, Any, Dict, Optional, AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import Annotated, Any, Dict, Optional, AsyncGenerator, AsyncIterator
 
+import orjson
 from dotenv import load_dotenv
 from fastapi import Depends, FastAPI, HTTPException, Request
-from langfuse import get_client
 from pydantic import BaseModel
 from pydantic_ai import Agent
 from pydantic_ai.models.openai import OpenAIChatModel
 from pydantic_ai.providers.openai import OpenAIProvider
 
 from ..agents import (
+    ClassifyAndMaybeSummarizeAgent,
     EmailClassifierAgent,
     EmailDrafterAgent,
     EmailSchedulerAgent,
@@ -21,12 +22,74 @@ from ..agents import (
     PreferenceExtractionAgent,
 )
 from ..business.models import Action, Email
+from ..llm_cache import LLMCache, RedisCacheBackend
 from ..logging_utils import logs_handler
 from ..orchestrator import Orchestrator
 from ..storage.db import Database
 from ..user_actions import approve_action, modify_action, reject_action
 
-app = FastAPI(title="Email Assistant API", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Build the model, agents and orchestrator once for the app's lifetime.
+
+    Agent construction compiles instructions and output schemas, so doing it
+    per request would pay that cost on every call.
+    """
+    logger = logs_handler.get_logger()
+    model_name = os.getenv("OPENAI_MODEL", "gpt-4o")
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        logger.warning("OPENAI_API_KEY missing; downstream agents may fail to call OpenAI")
+
+    provider = OpenAIProvider(api_key=api_key) if api_key else OpenAIProvider()
+    model = OpenAIChatModel(model_name, provider=provider)
+
+    # One exact-match cache shared by every agent: identical prompts skip the
+    # LLM round-trip regardless of which agent issued them first.
+    redis_url = os.getenv("LLM_CACHE_REDIS_URL")
+    cache = LLMCache(RedisCacheBackend(redis_url) if redis_url else None)
+    app.state.llm_cache = cache
+    # The semantic cache loads a SentenceTransformer at startup, so it stays
+    # opt-in like Langfuse tracing.
+    semantic_cache = None
+    triage_semantic_cache = None
+    if os.getenv("ENABLE_SEMANTIC_CACHE", "false").strip().lower() == "true":
+        from ..storage.semantic_cache import SemanticCache
+
+        semantic_cache = SemanticCache()
+        # The classifier and triage agents embed the same thread prompt but
+        # store differently shaped payloads, and EmailClassification rejects
+        # unknown fields — so each output model gets its own cache, sharing
+        # one embedding model.
+        triage_semantic_cache = SemanticCache(model=semantic_cache.model)
+    app.state.semantic_cache = semantic_cache
+
+    app.state.classifier = EmailClassifierAgent(model, cache=cache, semantic_cache=semantic_cache)
+    app.state.drafter = EmailDrafterAgent(model, cache=cache)
+    app.state.scheduler = EmailSchedulerAgent(model, cache=cache)
+    app.state.summarizer = EmailSummarizerAgent(model, cache=cache)
+    app.state.preference_extractor = PreferenceExtractionAgent(model, cache=cache)
+    app.state.triage = ClassifyAndMaybeSummarizeAgent(
+        model, cache=cache, semantic_cache=triage_semantic_cache
+    )
+    app.state.db = Database(check_same_thread=False)
+    app.state.orchestrator = Orchestrator(
+        classifier=app.state.classifier,
+        drafter=app.state.drafter,
+        scheduler=app.state.scheduler,
+        summarizer=app.state.summarizer,
+        database=app.state.db,
+        triage=app.state.triage,
+    )
+
+    await _warm_connection_pool(provider)
+    try:
+        yield
+    finally:
+        app.state.db.conn.close()
+
+
+app = FastAPI(title="Email Assistant API", version="0.1.0", lifespan=lifespan)
 Agent.instrument_all()
 
 
@@ -72,39 +135,23 @@ async def get_db() -> AsyncGenerator[Database, None]:
         db.conn.close()
 
 
-def get_orchestrator(
-    request: Request, db: Annotated[Database, Depends(get_db)]
-) -> Orchestrator:
-    state = request.app.state
-    return Orchestrator(
-        classifier=state.classifier,
-        drafter=state.drafter,
-        scheduler=state.scheduler,
-        summarizer=state.summarizer,
-        database=db,
-    )
+def get_orchestrator(request: Request) -> Orchestrator:
+    return request.app.state.orchestrator
 
 
 def get_preference_extractor(request: Request) -> PreferenceExtractionAgent | None:
     return getattr(request.app.state, "preference_extractor", None)
 
 
-@app.on_event("startup")
-async def startup() -> None:
+async def _warm_connection_pool(provider: OpenAIProvider) -> None:
+    """Open the TLS/HTTP connection to OpenAI at startup instead of on the
+    first user request; models.list() is not billable."""
     logger = logs_handler.get_logger()
-    model_name = os.getenv("OPENAI_MODEL", "gpt-4o")
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        logger.warning("OPENAI_API_KEY missing; downstream agents may fail to call OpenAI")
-
-    provider = OpenAIProvider(api_key=api_key) if api_key else OpenAIProvider()
-    model = OpenAIChatModel(model_name, provider=provider)
-
-    app.state.classifier = EmailClassifierAgent(model)
-    app.state.drafter = EmailDrafterAgent(model)
-    app.state.scheduler = EmailSchedulerAgent(model)
-    app.state.summarizer = EmailSummarizerAgent(model)
-    app.state.preference_extractor = PreferenceExtractionAgent(model)
+    try:
+        await provider.client.models.list()
+        logger.debug("OpenAI connection pool warmed")
+    except Exception as exc:
+        logger.warning("OpenAI connection warmup failed: %s", exc)
 
 
 @app.post("/new_email", response_model=NewEmailResponse)
@@ -160,7 +207,9 @@ async def modify_action_endpoint(
     ],
 ) -> Action:
     action = _fetch_action_or_404(db, payload.action_id)
-    original_payload = copy.deepcopy(action.payload)
+    # Payloads are plain JSON trees, so an orjson round-trip snapshots them
+    # several times faster than copy.deepcopy's generic dispatch.
+    original_payload = orjson.loads(orjson.dumps(action.payload))
 
     extractor = preference_extractor if payload.record_preferences else None
     updated = await asyncio.to_thread(
@@ -0,0 +1,3 @@
+from .fleet import FleetDispatcher, OpenAIBatchExecutor
+
+__all__ = ["FleetDispatcher", "OpenAIBatchExecutor"]
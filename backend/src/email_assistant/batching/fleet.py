@@ -0,0 +1,170 @@
+"""Fleet-level coalescing of LLM calls into provider batch requests.
+
+Non-interactive paths (summaries, drafts with a loose latency budget) can
+tolerate a short queueing delay; pooling their prompts into one OpenAI Batch
+submission halves input-token cost and amortizes HTTP/TLS overhead across N
+prompts. Latency-critical calls (the classifier) should keep using the normal
+per-request path.
+"""
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List
+
+from ..logging_utils import logs_handler
+
+logger = logs_handler.get_logger()
+
+DEFAULT_BATCH_MIN_SIZE = 4
+DEFAULT_BATCH_WINDOW_MS = 250
+DEFAULT_POLL_INTERVAL_S = 5.0
+
+# An executor receives the pending items and resolves a result per custom_id.
+BatchExecutor = Callable[[List["BatchItem"]], Awaitable[Dict[str, Any]]]
+
+
+class BatchItem:
+    """One pooled chat request awaiting a batched round-trip."""
+
+    __slots__ = ("custom_id", "chat_kwargs", "future")
+
+    def __init__(self, custom_id: str, chat_kwargs: Dict[str, Any], future: asyncio.Future) -> None:
+        self.custom_id = custom_id
+        self.chat_kwargs = chat_kwargs
+        self.future = future
+
+
+class FleetDispatcher:
+    """Pools chat requests arriving within a window into one batch submission.
+
+    Usage::
+
+        async with FleetDispatcher(executor) as fleet:
+            result = await fleet.submit(model="gpt-4o", messages=[...])
+    """
+
+    def __init__(
+        self,
+        executor: BatchExecutor,
+        *,
+        batch_min_size: int = DEFAULT_BATCH_MIN_SIZE,
+        batch_window_ms: int = DEFAULT_BATCH_WINDOW_MS,
+    ) -> None:
+        self._executor = executor
+        self._batch_min_size = batch_min_size
+        self._batch_window = batch_window_ms / 1000.0
+        self._queue: asyncio.Queue[BatchItem] = asyncio.Queue()
+        self._flusher: asyncio.Task | None = None
+        self._closed = False
+
+    async def __aenter__(self) -> "FleetDispatcher":
+        self._flusher = asyncio.create_task(self._flush_loop())
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self._closed = True
+        if self._flusher is not None:
+            await self._flusher
+
+    async def submit(self, **chat_kwargs: Any) -> Any:
+        """Queue one chat request; resolves when its batch round-trips."""
+        if self._closed:
+            raise RuntimeError("FleetDispatcher is closed")
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        item = BatchItem(uuid.uuid4().hex, chat_kwargs, future)
+        await self._queue.put(item)
+        return await future
+
+    async def _flush_loop(self) -> None:
+        while not (self._closed and self._queue.empty()):
+            batch = await self._collect_batch()
+            if not batch:
+                continue
+            try:
+                results = await self._executor(batch)
+            except Exception as exc:
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(exc)
+                continue
+            for item in batch:
+                if item.future.done():
+                    continue
+                if item.custom_id in results:
+                    item.future.set_result(results[item.custom_id])
+                else:
+                    item.future.set_exception(
+                        RuntimeError(f"Batch result missing for {item.custom_id}")
+                    )
+
+    async def _collect_batch(self) -> List[BatchItem]:
+        """Drain the queue until the window elapses or the batch is full enough."""
+        batch: List[BatchItem] = []
+        try:
+            first = await asyncio.wait_for(self._queue.get(), timeout=self._batch_window)
+        except asyncio.TimeoutError:
+            return batch
+        batch.append(first)
+
+        deadline = asyncio.get_running_loop().time() + self._batch_window
+        while len(batch) < self._batch_min_size:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        # Keep draining anything already queued without waiting further.
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+
+class OpenAIBatchExecutor:
+    """Runs pooled items through the OpenAI Batch API (/v1/batches)."""
+
+    def __init__(self, client: Any, *, poll_interval: float = DEFAULT_POLL_INTERVAL_S) -> None:
+        self._client = client
+        self._poll_interval = poll_interval
+
+    async def __call__(self, batch: List[BatchItem]) -> Dict[str, Any]:
+        lines = [
+            json.dumps(
+                {
+                    "custom_id": item.custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": item.chat_kwargs,
+                }
+            )
+            for item in batch
+        ]
+        upload = await self._client.files.create(
+            file=io.BytesIO("\n".join(lines).encode("utf-8")),
+            purpose="batch",
+        )
+        job = await self._client.batches.create(
+            input_file_id=upload.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        logger.info("Submitted batch %s with %d requests", job.id, len(batch))
+
+        while job.status not in {"completed", "failed", "expired", "cancelled"}:
+            await asyncio.sleep(self._poll_interval)
+            job = await self._client.batches.retrieve(job.id)
+        if job.status != "completed":
+            raise RuntimeError(f"Batch {job.id} finished with status {job.status}")
+
+        output = await self._client.files.content(job.output_file_id)
+        results: Dict[str, Any] = {}
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            results[record["custom_id"]] = record.get("response", {}).get("body")
+        return results
@@ -1,7 +1,7 @@
 # src/models.py
 from typing import List, Optional, Dict, Any, Iterable
 import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 
 class Email(BaseModel):
@@ -24,9 +24,16 @@ class Action(BaseModel):
     mail_id: Optional[str] = None
     type: str
     status: str
-    payload: Dict[str, Any]
+    payload: Dict[str, Any] = Field(default_factory=dict)
     result: Optional[Dict[str, Any]] = None
 
+    @field_validator("payload", mode="before")
+    @classmethod
+    def _coerce_payload(cls, value: Any) -> Dict[str, Any]:
+        # Coerced once at validation time so downstream code never needs
+        # `payload or {}` / isinstance guards.
+        return value or {}
+
 
 class Summary(BaseModel):
     summary_id: str
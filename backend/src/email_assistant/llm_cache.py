@@ -0,0 +1,123 @@
+"""Content-addressed cache for deterministic LLM agent calls."""
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Protocol
+
+from .logging_utils import logs_handler
+
+logger = logs_handler.get_logger()
+
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MAX_ENTRIES = 1024
+
+
+class CacheBackend(Protocol):
+    """Minimal key/value store used by :class:`LLMCache`."""
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        ...
+
+
+class InMemoryCacheBackend:
+    """LRU dict backend with per-entry TTL expiry."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self._entries: OrderedDict[str, tuple[float, Dict[str, Any]]] = OrderedDict()
+        self._max_entries = max_entries
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+
+class RedisCacheBackend:
+    """Optional Redis backend; requires the `redis` package."""
+
+    def __init__(self, url: str = "redis://localhost:6379/0", *, prefix: str = "llm_cache:") -> None:
+        import redis  # imported lazily so redis stays an optional dependency
+
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self._client.get(self._prefix + key)
+        if raw is None:
+            return None
+        # Parse the raw bytes in native code when orjson is available instead
+        # of going through Python-level json.loads.
+        if orjson is not None:
+            return orjson.loads(raw)
+        return json.loads(raw)
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        if orjson is not None:
+            self._client.set(self._prefix + key, orjson.dumps(value), ex=ttl)
+        else:
+            self._client.set(self._prefix + key, json.dumps(value), ex=ttl)
+
+
+class LLMCache:
+    """Exact-match cache keyed on (agent name, instructions, prompt).
+
+    The structured-output agents are effectively deterministic for a given
+    prompt, so identical threads can skip the remote LLM round-trip entirely.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend | None = None,
+        *,
+        ttl: int = DEFAULT_TTL_SECONDS,
+    ) -> None:
+        self._backend = backend or InMemoryCacheBackend()
+        self._ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(agent_name: str, instructions: str, prompt: str) -> str:
+        payload = json.dumps(
+            {"agent": agent_name, "instructions": instructions, "prompt": prompt},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._backend.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        logger.debug("LLM cache hit (hits=%d, misses=%d)", self.hits, self.misses)
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self._backend.set(key, value, self._ttl)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
@@ -1,4 +1,38 @@
 import logging
+import os
+
+# Langfuse tracing is opt-in: when ENABLE_LANGFUSE is not set to "true" the
+# decorator and client below are inert, so hot paths skip span creation and
+# context-var bookkeeping entirely.
+LANGFUSE_ENABLED = os.getenv("ENABLE_LANGFUSE", "false").strip().lower() == "true"
+
+if LANGFUSE_ENABLED:
+    from langfuse import get_client as get_langfuse_client
+    from langfuse import observe
+else:
+
+    class _NoopLangfuseClient:
+        """Stand-in for the Langfuse client when tracing is disabled."""
+
+        def update_current_trace(self, **kwargs) -> None:
+            return None
+
+        def auth_check(self) -> bool:
+            return False
+
+        def flush(self) -> None:
+            return None
+
+    _noop_client = _NoopLangfuseClient()
+
+    def get_langfuse_client() -> "_NoopLangfuseClient":
+        return _noop_client
+
+    def observe(**_kwargs):
+        def _decorator(func):
+            return func
+
+        return _decorator
 
 
 def _parse_level(level_str: str | None) -> int:
@@ -28,6 +62,8 @@ class LogsHandler:
         # configure only our logger
         logger = logging.getLogger(self._logger_name)
         logger.setLevel(resolved)
+        # our handler formats records itself; don't pay for the root logger too
+        logger.propagate = False
         print(f"log level set to {level}")
 
         if not logger.handlers:  # avoid adding duplicates
@@ -6,22 +6,38 @@ import logging
 import os
 
 from dotenv import load_dotenv
-from langfuse import get_client
-from pydantic_ai import Agent
 
-import uvicorn
 from .logging_utils import logs_handler
 
+# Heavy dependencies (pydantic_ai, langfuse, uvicorn) are imported inside the
+# functions that need them so `--help` and light script paths don't pay the
+# full import cost.
 
-Agent.instrument_all()
 
 def setup_environment() -> None:
     load_dotenv()
     logs_handler.setup_logging(level=os.getenv("LOG_LEVEL", "debug"))
 
+    try:
+        import uvloop
+    except ImportError:  # pragma: no cover - optional speedup, not on Windows
+        pass
+    else:
+        uvloop.install()
+
+    from pydantic_ai import Agent
+
+    Agent.instrument_all()
+
 
 def check_langfuse(logger: logging.Logger) -> None:
-    langfuse = get_client()
+    from .logging_utils import LANGFUSE_ENABLED, get_langfuse_client
+
+    if not LANGFUSE_ENABLED:
+        logger.debug("Langfuse tracing disabled (set ENABLE_LANGFUSE=true to enable)")
+        return
+
+    langfuse = get_langfuse_client()
     if langfuse.auth_check():
         logger.debug("Langfuse client authenticated and ready!")
     else:
@@ -29,6 +45,15 @@ def check_langfuse(logger: logging.Logger) -> None:
 
 
 def run_api(host: str, port: int, reload: bool) -> None:
+    import uvicorn
+
+    try:
+        import uvloop  # noqa: F401
+    except ImportError:  # pragma: no cover - optional speedup, not on Windows
+        loop = "auto"
+    else:
+        loop = "uvloop"
+
     logger = logs_handler.get_logger()
     logger.info("Starting API server at %s:%s (reload=%s)", host, port, reload)
     uvicorn.run(
@@ -36,6 +61,7 @@ def run_api(host: str, port: int, reload: bool) -> None:
         host=host,
         port=port,
         reload=reload,
+        loop=loop,
     )
 
 
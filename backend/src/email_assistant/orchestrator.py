@@ -2,12 +2,13 @@
 from __future__ import annotations
 
 import asyncio
-import uuid
+import os
+from collections import OrderedDict
 from itertools import chain
-from typing import Any, Dict, Sequence, Awaitable
-from langfuse import observe, get_client
-
+from uuid import uuid4
+from typing import Any, AsyncIterable, Dict, Sequence
 from .agents import (
+    ClassifyAndMaybeSummarizeAgent,
     EmailClassification,
     EmailClassifierAgent,
     EmailDrafterAgent,
@@ -16,12 +17,35 @@ from .agents import (
     EmailSummarizerAgent,
     ProposedEvent,
 )
+from .agents.prefilter import is_trivial
+from .agents.utils import disable_thread_format_cache, enable_thread_format_cache
 from .business.models import Action, DraftingPreferences, Email, Summary
 from .storage.db import Database
-from .logging_utils import logs_handler
+from .logging_utils import get_langfuse_client, logs_handler, observe
 
 logger = logs_handler.get_logger()
 
+# Emails landing on the same thread within this window share one
+# classification/summary pass instead of each re-fetching and re-classifying.
+THREAD_COALESCE_WINDOW_SECONDS = float(os.getenv("THREAD_COALESCE_WINDOW_MS", "50")) / 1000.0
+
+# Recently processed threads kept in memory so a follow-up on a hot thread
+# appends one Email instead of re-reading and re-parsing every prior row.
+THREAD_CACHE_SIZE = 128
+
+
+class _InflightThread:
+    """Book-keeping for one thread's in-progress orchestration."""
+
+    __slots__ = ("future", "fetched", "mail_ids")
+
+    def __init__(self, future: "asyncio.Future[Dict[str, Any]]") -> None:
+        self.future = future
+        # Once the leader has fetched the thread, late arrivals can no longer
+        # piggyback: their email would be missing from the fetched rows.
+        self.fetched = False
+        self.mail_ids: list[str] = []
+
 
 class Orchestrator:
     def __init__(
@@ -32,91 +56,284 @@ class Orchestrator:
         scheduler: EmailSchedulerAgent,
         summarizer: EmailSummarizerAgent,
         database: Database | None = None,
+        triage: ClassifyAndMaybeSummarizeAgent | None = None,
     ) -> None:
-        self.db = database or Database()
+        self.db = database or Database(check_same_thread=False)
         self.classifier = classifier
+        # When set, classification and summary come back in one LLM response;
+        # the standalone summarizer then only runs as a fallback.
+        self.triage = triage
         self.drafter = drafter
         self.scheduler = scheduler
         self.summarizer = summarizer
+        self._inflight: Dict[str, _InflightThread] = {}
+        self._inflight_lock = asyncio.Lock()
+        self._thread_cache: OrderedDict[str, list[Email]] = OrderedDict()
 
     @observe()
     async def process_new_email(self, email: Email) -> Dict[str, Any]:
-        langfuse = get_client()
-        session_id = uuid.uuid4()
-        langfuse.update_current_trace(session_id=f"{session_id}")
-
-        self.db.insert_email(email)
-        thread = self.db.fetch_emails_for_thread(email.thread_id)
-        print(f"fetched {len(thread)} emails")
-        classification: EmailClassification = await self.classifier.classify_async(thread)
-        decisions = self.classifier.decisions(classification)
-
-        proposed_actions: list[Dict[str, Any]] = []
-        summary_text: str | None = None
-
-        agent_coroutines: Dict[str, Awaitable[Any]] = {}
-        if decisions["needs_summary"]:
-            agent_coroutines["summary"] = self.summarizer.summarize_async(thread)
-
-        if decisions["needs_draft"]:
-            draft_preferences = self._build_drafting_preferences(thread)
-            logger.debug(f"Preferences applying to this email: {draft_preferences}")
-            agent_coroutines["draft"] = self.drafter.draft_async(
-                thread,
-                preferences=draft_preferences,
-            )
+        langfuse = get_langfuse_client()
+        # Trace ids don't need the hyphenated form; .hex skips the formatting.
+        langfuse.update_current_trace(session_id=uuid4().hex)
 
-        if decisions["needs_schedule"]:
-            agent_coroutines["schedule"] = self.scheduler.propose_event_async(thread)
-
-        agent_results: Dict[str, Any] = {}
-        if agent_coroutines:
-            completed = await asyncio.gather(*agent_coroutines.values())
-            agent_results = dict(zip(agent_coroutines.keys(), completed))
-
-        summary = agent_results.get("summary")
-        if summary is not None:
-            summary_text = summary.summary
-            summary_record = Summary(
-                summary_id=str(uuid.uuid4()),
-                thread_id=email.thread_id,
-                text=summary_text,
-            )
-            self.db.insert_summary(summary_record)
-
-        draft: EmailDraft | None = agent_results.get("draft")
-        if draft is not None:
-            action = Action(
-                action_id=str(uuid.uuid4()),
-                mail_id=email.mail_id,
-                type="send_email",
-                status="pending",
-                payload=draft.model_dump(),
+        if is_trivial(email):
+            # Obviously non-actionable mail skips the classifier (and any
+            # downstream agents) entirely; the email is still stored.
+            await asyncio.to_thread(self.db.insert_email, email)
+            probs = {"needs_summary": 0.0, "needs_draft": 0.0, "needs_schedule": 0.0}
+            return {
+                "mail_id": email.mail_id,
+                "summary": None,
+                "proposed_actions": [],
+                "classification": {
+                    "probabilities": probs,
+                    "decisions": self.classifier.decisions_from_probs(probs),
+                },
+            }
+
+        cached = self._thread_cache.pop(email.thread_id, None)
+        if cached is not None:
+            # Serve the prior rows from memory and validate with a COUNT on
+            # the covering index. emails is insert-only, so a matching count
+            # guarantees the cached list plus our email is the whole thread;
+            # any external write (e.g. a stored sent reply) shows up as a
+            # mismatch and forces a full re-read.
+            await asyncio.to_thread(self.db.insert_email, email)
+            if all(existing.mail_id != email.mail_id for existing in cached):
+                prefetched = sorted([*cached, email], key=lambda e: e.received_at)
+            else:
+                prefetched = cached
+            count = await asyncio.to_thread(self.db.count_emails_in_thread, email.thread_id)
+            if count != len(prefetched):
+                prefetched = await asyncio.to_thread(
+                    self.db.fetch_emails_for_thread, email.thread_id
+                )
+        else:
+            # Blocking sqlite3 work is handed to worker threads so the event
+            # loop keeps progressing other requests' I/O. The thread prefetch
+            # runs concurrently with the insert; under WAL readers don't block
+            # on the writer, and the new email is merged in locally if the
+            # read raced ahead of the commit.
+            _, prefetched = await asyncio.gather(
+                asyncio.to_thread(self.db.insert_email, email),
+                asyncio.to_thread(self.db.fetch_emails_for_thread, email.thread_id),
             )
-            self.db.insert_action(action)
-            proposed_actions.append(action.model_dump())
-
-        event: ProposedEvent | None = agent_results.get("schedule")
-        if event is not None:
-            action = Action(
-                action_id=str(uuid.uuid4()),
-                mail_id=email.mail_id,
-                type="create_event",
-                status="pending",
-                payload=event.model_dump(),
+            if all(existing.mail_id != email.mail_id for existing in prefetched):
+                prefetched = sorted([*prefetched, email], key=lambda e: e.received_at)
+
+        async with self._inflight_lock:
+            entry = self._inflight.get(email.thread_id)
+            if entry is not None and not entry.fetched:
+                # Another request is about to fetch this thread; our email is
+                # already inserted so it will be part of that fetch. Share
+                # the leader's classification/summary work.
+                entry.mail_ids.append(email.mail_id)
+                shared_future = entry.future
+            else:
+                entry = _InflightThread(asyncio.get_running_loop().create_future())
+                entry.mail_ids.append(email.mail_id)
+                self._inflight[email.thread_id] = entry
+                shared_future = None
+
+        if shared_future is not None:
+            shared = await shared_future
+            return {**shared, "mail_id": email.mail_id}
+
+        try:
+            result = await self._process_thread(email, prefetched)
+        except BaseException as exc:
+            entry.future.set_exception(exc)
+            entry.future.exception()  # retrieved here; followers re-await it
+            raise
+        else:
+            entry.future.set_result(result)
+            return result
+        finally:
+            async with self._inflight_lock:
+                if self._inflight.get(email.thread_id) is entry:
+                    del self._inflight[email.thread_id]
+
+    async def process_stream(
+        self,
+        emails: AsyncIterable[Email],
+        *,
+        max_concurrency: int = 8,
+    ) -> list[Dict[str, Any]]:
+        """Process a stream of incoming emails with overlapping pipelines.
+
+        Each email's insert/fetch/classify/fan-out stages run inside its own
+        process_new_email task, so while one email waits on the LLM another
+        is doing its DB work; the semaphore bounds how many are in flight,
+        giving the same backpressure a staged queue would. Results come back
+        in arrival order.
+        """
+        gate = asyncio.Semaphore(max_concurrency)
+
+        async def _bounded(email: Email) -> Dict[str, Any]:
+            async with gate:
+                return await self.process_new_email(email)
+
+        tasks: list[asyncio.Task[Dict[str, Any]]] = []
+        async for email in emails:
+            tasks.append(asyncio.create_task(_bounded(email)))
+        return list(await asyncio.gather(*tasks))
+
+    async def _process_thread(
+        self, email: Email, prefetched: list[Email] | None = None
+    ) -> Dict[str, Any]:
+        format_cache_token = enable_thread_format_cache()
+        try:
+            if THREAD_COALESCE_WINDOW_SECONDS > 0:
+                await asyncio.sleep(THREAD_COALESCE_WINDOW_SECONDS)
+            async with self._inflight_lock:
+                inflight = self._inflight.get(email.thread_id)
+                has_followers = inflight is not None and len(inflight.mail_ids) > 1
+                if inflight is not None:
+                    inflight.fetched = True
+            if prefetched is not None and not has_followers:
+                thread = prefetched
+            else:
+                # Followers coalesced onto this pass after the prefetch, so
+                # re-read to pick up their rows.
+                thread = await asyncio.to_thread(self.db.fetch_emails_for_thread, email.thread_id)
+            logger.debug("fetched %d emails", len(thread))
+            self._thread_cache[email.thread_id] = thread
+            self._thread_cache.move_to_end(email.thread_id)
+            while len(self._thread_cache) > THREAD_CACHE_SIZE:
+                self._thread_cache.popitem(last=False)
+            proposed_actions: list[Dict[str, Any]] = []
+            summary_text: str | None = None
+
+            classification: EmailClassification | None = None
+            agent_tasks: Dict[str, asyncio.Task[Any]] = {}
+            classify_agent = self.triage or self.classifier
+            threshold = classify_agent.decision_threshold
+
+            def _dispatch(name: str) -> None:
+                if name == "summary":
+                    agent_tasks["summary"] = asyncio.create_task(
+                        self.summarizer.summarize_async(thread)
+                    )
+                elif name == "draft":
+                    agent_tasks["draft"] = asyncio.create_task(self._draft_with_preferences(thread))
+                elif name == "schedule":
+                    agent_tasks["schedule"] = asyncio.create_task(
+                        self.scheduler.propose_event_async(thread)
+                    )
+
+            # Consume the classifier's streamed output and dispatch downstream
+            # agents as soon as a probability crosses the threshold. A streamed
+            # decimal prefix never exceeds its final value, so an early
+            # dispatch can never contradict the final decision. With the
+            # combined triage agent the summary arrives in the same response,
+            # so that task is never dispatched early.
+            async for partial in classify_agent.classify_stream_async(thread):
+                classification = partial
+                for name, attr in (
+                    ("summary", "needs_summary"),
+                    ("draft", "needs_draft"),
+                    ("schedule", "needs_schedule"),
+                ):
+                    if name in agent_tasks:
+                        continue
+                    if name == "summary" and self.triage is not None:
+                        continue
+                    probability = getattr(partial, attr, None)
+                    if probability is not None and probability >= threshold:
+                        _dispatch(name)
+
+            if classification is None:
+                raise RuntimeError("Classifier stream produced no output")
+            inline_summary: str | None = getattr(classification, "summary", None)
+            # Dump the probabilities once; both the decisions and the response
+            # body read from the plain dict.
+            probs = classification.as_dict()
+            decisions = classify_agent.decisions_from_probs(probs)
+            for name, attr in (
+                ("summary", "needs_summary"),
+                ("draft", "needs_draft"),
+                ("schedule", "needs_schedule"),
+            ):
+                if name == "summary" and inline_summary:
+                    continue
+                if decisions[attr] and name not in agent_tasks:
+                    _dispatch(name)
+
+            agent_results: Dict[str, Any] = {}
+            if agent_tasks:
+                completed = await asyncio.gather(*agent_tasks.values())
+                agent_results = dict(zip(agent_tasks.keys(), completed))
+
+            summary = agent_results.get("summary")
+            summary_record: Summary | None = None
+            if summary is not None:
+                summary_text = summary.summary
+            elif inline_summary and decisions["needs_summary"]:
+                summary_text = inline_summary
+            if summary_text:
+                summary_record = Summary(
+                    summary_id=uuid4().hex,
+                    thread_id=email.thread_id,
+                    text=summary_text,
+                )
+
+            new_actions: list[Action] = []
+            draft: EmailDraft | None = agent_results.get("draft")
+            if draft is not None:
+                new_actions.append(
+                    Action(
+                        action_id=uuid4().hex,
+                        mail_id=email.mail_id,
+                        type="send_email",
+                        status="pending",
+                        payload=draft.model_dump(),
+                    )
+                )
+
+            event: ProposedEvent | None = agent_results.get("schedule")
+            if event is not None:
+                new_actions.append(
+                    Action(
+                        action_id=uuid4().hex,
+                        mail_id=email.mail_id,
+                        type="create_event",
+                        status="pending",
+                        payload=event.model_dump(),
+                    )
+                )
+
+            # One transaction (and one fsync) for everything this email produced.
+            await asyncio.to_thread(self.db.commit_email_outputs, summary_record, new_actions)
+            # Reuse the already-dumped payload rather than letting model_dump()
+            # re-walk the nested draft/event dict a second time.
+            proposed_actions.extend(
+                {
+                    "action_id": action.action_id,
+                    "mail_id": action.mail_id,
+                    "type": action.type,
+                    "status": action.status,
+                    "payload": action.payload,
+                    "result": action.result,
+                }
+                for action in new_actions
             )
-            self.db.insert_action(action)
-            proposed_actions.append(action.model_dump())
-
-        return {
-            "mail_id": email.mail_id,
-            "summary": {"text": summary_text} if summary_text else None,
-            "proposed_actions": proposed_actions,
-            "classification": {
-                "probabilities": classification.as_dict(),
-                "decisions": decisions,
-            },
-        }
+
+            return {
+                "mail_id": email.mail_id,
+                "summary": {"text": summary_text} if summary_text else None,
+                "proposed_actions": proposed_actions,
+                "classification": {
+                    "probabilities": probs,
+                    "decisions": decisions,
+                },
+            }
+        finally:
+            disable_thread_format_cache(format_cache_token)
+
+    async def _draft_with_preferences(self, thread: Sequence[Email]) -> EmailDraft:
+        draft_preferences = await asyncio.to_thread(self._build_drafting_preferences, thread)
+        logger.debug("Preferences applying to this email: %s", draft_preferences)
+        return await self.drafter.draft_async(thread, preferences=draft_preferences)
 
     @observe()
     def _build_drafting_preferences(self, thread: Sequence[Email]) -> DraftingPreferences | None:
@@ -124,26 +341,36 @@ class Orchestrator:
         preferences = DraftingPreferences.from_general_preferences(general_preferences)
 
         recipient_emails = self._infer_reply_recipients(thread)
-        logger.debug(f"recipient emails: {recipient_emails}")
+        logger.debug("recipient emails: %s", recipient_emails)
+        # Most recipients have no stored overrides; filtering against the
+        # cached set makes the common case zero preference queries.
+        recipients_with_prefs = self.db.recipients_with_prefs
+        recipient_emails = [addr for addr in recipient_emails if addr in recipients_with_prefs]
+        preferences_by_recipient = self.db.fetch_preferences_for_recipients(recipient_emails)
         formal_tone_value: str | None = None  # Formal >> casual
         for email_address in recipient_emails:
-            recipient_preferences = self.db.fetch_preferences_for_recipient(email_address)
+            recipient_preferences = preferences_by_recipient.get(email_address)
             if not recipient_preferences:
                 continue
 
-            logger.debug(f"{email_address} : {recipient_preferences}")
+            logger.debug("%s : %s", email_address, recipient_preferences)
             preferences.apply_action_preferences(recipient_preferences)
 
             if formal_tone_value is None:
                 # check if this recipient has formal tone preference
                 tone_pref = next(
-                    (p for p in recipient_preferences if p.preference_key == "tone"),
+                    (
+                        p
+                        for p in recipient_preferences
+                        if p.preference_key == "tone"
+                        and "formal" in p.preference_value.casefold()
+                    ),
                     None,
                 )
-                if tone_pref and "formal" in tone_pref.preference_value.lower():
+                if tone_pref is not None:
                     formal_tone_value = tone_pref.preference_value
                     logger.debug(
-                        f"Formal tone preference will be applied because of {email_address}"
+                        "Formal tone preference will be applied because of %s", email_address
                     )
 
         if formal_tone_value:
@@ -163,4 +390,13 @@ class Orchestrator:
             latest.cc or [],
         )
 
-        return list(dict.fromkeys(addr.lower() for addr in sources if addr))
+        seen: set[str] = set()
+        recipients: list[str] = []
+        for addr in sources:
+            if not addr:
+                continue
+            normalized = addr.casefold()
+            if normalized not in seen:
+                seen.add(normalized)
+                recipients.append(normalized)
+        return recipients
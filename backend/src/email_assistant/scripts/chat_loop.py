@@ -1,25 +1,43 @@
 from __future__ import annotations
 
 import os
-from typing import Dict, List
+from typing import List
 import asyncio
 
 from dotenv import load_dotenv
 
-from ..agents import EmailConversationAgent, EmailDrafterAgent, EmailSchedulerAgent
+from ..agents import (
+    ConversationTurn,
+    EmailConversationAgent,
+    EmailDrafterAgent,
+    EmailSchedulerAgent,
+)
+from ..llm_cache import LLMCache
 from ..logging_utils import logs_handler
 from ..storage.db import Database
 from pathlib import Path
 
 from ..storage.vector_store import EmailVectorStore
+import httpx
 from pydantic_ai.models.openai import OpenAIChatModel
 from pydantic_ai.providers.openai import OpenAIProvider
 
 
-def _build_model() -> OpenAIChatModel:
+def _build_http_client() -> httpx.AsyncClient:
+    # One shared client keeps connections alive across REPL turns, so each
+    # agent call reuses the pool instead of paying a fresh TLS handshake.
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=30)
+    )
+
+
+def _build_model(http_client: httpx.AsyncClient) -> OpenAIChatModel:
     model_name = os.getenv("OPENAI_MODEL", "gpt-4o")
     api_key = os.getenv("OPENAI_API_KEY")
-    provider = OpenAIProvider(api_key=api_key) if api_key else OpenAIProvider()
+    if api_key:
+        provider = OpenAIProvider(api_key=api_key, http_client=http_client)
+    else:
+        provider = OpenAIProvider(http_client=http_client)
     return OpenAIChatModel(model_name, provider=provider)
 
 
@@ -27,7 +45,8 @@ async def main() -> None:
     load_dotenv()
     logs_handler.setup_logging("debug")
 
-    model = _build_model()
+    http_client = _build_http_client()
+    model = _build_model(http_client)
     index_dir = os.getenv("VECTOR_INDEX_DIR")
     vector_store: EmailVectorStore
     if index_dir:
@@ -42,8 +61,11 @@ async def main() -> None:
     else:
         vector_store = EmailVectorStore()
         database = Database(vector_store=vector_store, check_same_thread=False)
-    drafter = EmailDrafterAgent(model)
-    scheduler = EmailSchedulerAgent(model)
+    # Shared across both agents so repeated thread contexts within a session
+    # reuse earlier responses instead of re-calling the LLM.
+    cache = LLMCache()
+    drafter = EmailDrafterAgent(model, cache=cache)
+    scheduler = EmailSchedulerAgent(model, cache=cache)
     agent = EmailConversationAgent(
         model=model,
         database=database,
@@ -52,7 +74,7 @@ async def main() -> None:
         scheduler=scheduler,
     )
 
-    messages: List[Dict[str, str]] = []
+    messages: List[ConversationTurn] = []
     print("Type your message or 'exit' to quit.\n")
 
     try:
@@ -68,7 +90,7 @@ async def main() -> None:
             if user_text.lower() in {"exit", "quit"}:
                 break
 
-            messages.append({"role": "user", "content": user_text})
+            messages.append(ConversationTurn(role="user", content=user_text))
             reply = await agent.respond_async(messages)
 
             print("Assistant:\n" + reply.answer + "\n")
@@ -91,12 +113,18 @@ async def main() -> None:
                     print(f"Notes: {reply.event.notes}")
                 print()
 
-            messages.append({"role": "assistant", "content": reply.answer})
+            messages.append(ConversationTurn(role="assistant", content=reply.answer))
     except KeyboardInterrupt:
         print("\nInterrupted.")
     finally:
+        await http_client.aclose()
         database.conn.close()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop
+    except ImportError:  # pragma: no cover - optional speedup, not on Windows
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
@@ -2,20 +2,25 @@
 from __future__ import annotations
 
 import argparse
+import io
 import json
+import logging
 import os
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Iterable, Iterator
 
 from dotenv import load_dotenv
-from pydantic_ai import Agent
-from pydantic_ai.models.openai import OpenAIChatModel
-from pydantic_ai.providers.openai import OpenAIProvider
-from langfuse import get_client, observe
-
+from ..llm_cache import LLMCache
+from ..logging_utils import get_langfuse_client, observe
 
 from ..agents.preferences import PreferenceExtractionAgent
-from ..storage.db import Database
+from ..storage.db import get_db
+
+logger = logging.getLogger(__name__)
+
+# Module-level so repeated extract_preferences() calls in one process (e.g.
+# the reset_memory flow) reuse the response for an unchanged drafts file.
+_llm_cache = LLMCache()
 
 DEFAULT_APPROVED_DRAFTS_PATH = Path("./data/approved_drafts.json")
 DEFAULT_MODEL_NAME = "gpt-4o"
@@ -35,7 +40,19 @@ Fields:
 Return strictly valid JSON.
 """.strip()
 
-Agent.instrument_all()
+_instrumented = False
+
+
+def _ensure_instrumented() -> None:
+    # pydantic_ai is imported (and instrumentation installed) on first use
+    # rather than at module import, so merely importing this script — e.g.
+    # from the in-process reset_memory flow — stays cheap.
+    global _instrumented
+    if not _instrumented:
+        from pydantic_ai import Agent
+
+        Agent.instrument_all()
+        _instrumented = True
 
 
 def _load_approved_drafts(path: Path) -> list[dict[str, Any]]:
@@ -58,14 +75,29 @@ def _format_draft(draft: dict[str, Any], index: int) -> str:
     )
 
 
+def _iter_formatted(drafts: Iterable[dict[str, Any]]) -> Iterator[str]:
+    for index, draft in enumerate(drafts, start=1):
+        yield _format_draft(draft, index)
+
+
 def _build_prompt(drafts: Iterable[dict[str, Any]]) -> str:
-    formatted = [_format_draft(draft, index) for index, draft in enumerate(drafts, start=1)]
-    drafts_block = "\n\n".join(formatted) if formatted else "No drafts available."
-    return (
+    # Stream each formatted draft straight into one buffer; for large corpora
+    # this avoids holding both the per-draft list and the joined block.
+    buffer = io.StringIO()
+    buffer.write(
         "Review the approved drafts below and extract the user's general writing preferences.\n"
         "Focus on patterns consistent across the drafts.\n\n"
-        f"Approved drafts:\n{drafts_block}"
+        "Approved drafts:\n"
     )
+    wrote_any = False
+    for chunk in _iter_formatted(drafts):
+        if wrote_any:
+            buffer.write("\n\n")
+        buffer.write(chunk)
+        wrote_any = True
+    if not wrote_any:
+        buffer.write("No drafts available.")
+    return buffer.getvalue()
 
 
 def _ensure_api_key() -> str:
@@ -85,18 +117,25 @@ def extract_preferences(path: Path, *, model_name: str = DEFAULT_MODEL_NAME) ->
 
     prompt = _build_prompt(drafts)
 
+    _ensure_instrumented()
+    from pydantic_ai.models.openai import OpenAIChatModel
+    from pydantic_ai.providers.openai import OpenAIProvider
+
     model = OpenAIChatModel(model_name, provider=OpenAIProvider(api_key=api_key))
-    agent = PreferenceExtractionAgent(model, instructions=GENERAL_PREFERENCE_INSTRUCTIONS)
+    agent = PreferenceExtractionAgent(
+        model, instructions=GENERAL_PREFERENCE_INSTRUCTIONS, cache=_llm_cache
+    )
     extraction = agent.run_prompt(prompt)
     preferences = extraction.model_dump(exclude_none=True)
-    print(preferences)
+    logger.debug("Extracted preferences: %s", preferences)
     if not preferences:
         print("No general preferences detected.")
         return {}
 
-    db = Database()
-    for key, value in preferences.items():
-        db.upsert_general_preference(preference_key=key, preference_value=str(value))
+    db = get_db()
+    db.bulk_upsert_general_preferences(
+        [(key, str(value)) for key, value in preferences.items()]
+    )
 
     return preferences
 
@@ -118,7 +157,7 @@ def main() -> None:
     load_dotenv()
     
     # langfuse setup
-    langfuse = get_client()
+    langfuse = get_langfuse_client()
     if langfuse.auth_check():
         print("Langfuse client authenticated and ready!")
     else:
@@ -1,25 +1,52 @@
+import argparse
+import os
 import subprocess
 import sys
-import os
 
 ROOT_DB_FILE = "assistant.db"
 
-def run(cmd: list[str]) -> None:
-    """Run a command and exit if it fails."""
-    print(f"→ Running: {' '.join(cmd)}")
-    result = subprocess.run([sys.executable, "-m"] + cmd)
+_STEP_MODULES = [
+    "src.email_assistant.scripts.seed_db",
+    "src.email_assistant.scripts.extract_user_preferences",
+]
+
+
+def _run_isolated(module: str) -> None:
+    """Run a step in its own interpreter and exit if it fails."""
+    print(f"→ Running: {sys.executable} -m {module}")
+    result = subprocess.run([sys.executable, "-m", module])
     if result.returncode != 0:
         sys.exit(result.returncode)
 
+
 def main():
+    parser = argparse.ArgumentParser(description="Reset the assistant database and reseed it.")
+    parser.add_argument(
+        "--isolate",
+        action="store_true",
+        help="Run each step in a fresh interpreter instead of in-process.",
+    )
+    args = parser.parse_args()
+
     # Delete the database file if it exists
     if os.path.exists(ROOT_DB_FILE):
         print(f"→ Removing {ROOT_DB_FILE}")
         os.remove(ROOT_DB_FILE)
 
-    # Run your scripts
-    run(["src.email_assistant.scripts.seed_db"])
-    run(["src.email_assistant.scripts.extract_user_preferences"])
+    if args.isolate:
+        for module in _STEP_MODULES:
+            _run_isolated(module)
+        return
+
+    # In-process by default: spawning an interpreter per step re-imports
+    # pydantic/pydantic_ai/langfuse twice, which dominates the runtime of a
+    # reset. Imported lazily so --isolate keeps this process lightweight.
+    from .extract_user_preferences import main as extract_main
+    from .seed_db import main as seed_main
+
+    seed_main()
+    extract_main()
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -3,54 +3,54 @@ from __future__ import annotations
 
 import argparse
 import json
-import sqlite3
 from pathlib import Path
 from typing import Any, Dict
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
 from ..business.models import Action, Email
-from ..storage.db import Database
+from ..storage.db import Database, get_db
 
 DEFAULT_EMAILS_PATH = "./data/test_emails.json"
 DEFAULT_ACTIONS_PATH = "./data/approved_drafts.json"
 
 
 def _load_json(path: Path) -> Dict[str, Any]:
-    with path.open("r", encoding="utf-8-sig") as handle:
-        return json.load(handle)
+    # orjson parses the raw bytes in C; stripping the BOM up front replaces
+    # the utf-8-sig decode pass.
+    data = path.read_bytes()
+    if data.startswith(b"\xef\xbb\xbf"):
+        data = data[3:]
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
 
 
 def seed_emails(db: Database, dataset_path: Path) -> int:
     payload = _load_json(dataset_path)
-    inserted = 0
-
-    for email_data in payload.get("emails", []):
-        email = Email(**email_data)
-        try:
-            db.insert_email(email)
-            inserted += 1
-        except sqlite3.IntegrityError:
-            print(f"Skipping existing email {email.mail_id}")
-
+    emails = [Email(**email_data) for email_data in payload.get("emails", [])]
+    inserted = db.bulk_insert_emails(emails)
+    skipped = len(emails) - inserted
+    if skipped:
+        print(f"Skipped {skipped} existing emails")
     return inserted
 
 
 def seed_actions(db: Database, dataset_path: Path) -> int:
     payload = _load_json(dataset_path)
-    inserted = 0
-
-    for action_data in payload.get("approved_drafts", []):
-        action = Action(**action_data)
-        try:
-            db.insert_action(action)
-            inserted += 1
-        except sqlite3.IntegrityError:
-            print(f"Skipping existing action {action.action_id}")
-
+    actions = [Action(**action_data) for action_data in payload.get("approved_drafts", [])]
+    inserted = db.bulk_insert_actions(actions)
+    skipped = len(actions) - inserted
+    if skipped:
+        print(f"Skipped {skipped} existing actions")
     return inserted
 
 
 def seed_database(emails_path: Path, actions_path: Path) -> None:
-    db = Database()
+    db = get_db()
     email_count = seed_emails(db, emails_path)
     action_count = seed_actions(db, actions_path)
     print(f"Inserted {email_count} emails and {action_count} actions.")
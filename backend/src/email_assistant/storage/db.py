@@ -1,19 +1,120 @@
 
 # src/storage/db.py
 import sqlite3
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Iterator, Optional, List, Sequence
+import functools
 import json
+import os
+import threading
 import uuid
 import logging
 import datetime
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+if orjson is not None:
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+else:
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+
+    _loads = json.loads
+
 from ..business.models import Email, Action, Summary, ActionPreference
-from .vector_store import EmailVectorStore
+from .vector_store import EmailVectorStore, _build_snippet, email_fields_to_text, email_to_text
 
 logger = logging.getLogger(__name__)
 DB_PATH = Path("assistant.db")
 
+# Bumped when a one-time migration (like the vector_text backfill) must run;
+# stored in the file via PRAGMA user_version so reopening a migrated database
+# costs one pragma read instead of a full-table scan.
+_SCHEMA_VERSION = 1
+
+_fromisoformat = datetime.datetime.fromisoformat
+
+# Decode JSON and TIMESTAMP columns inside sqlite3's fetch loop instead of
+# per-row Python calls at every call site. The converters only fire on
+# connections opened with detect_types, so other sqlite users in the process
+# are unaffected. Registering TIMESTAMP ourselves also keeps us off the
+# stdlib's deprecated default timestamp converter.
+sqlite3.register_converter("JSON", _loads)
+sqlite3.register_converter("TIMESTAMP", lambda value: _fromisoformat(value.decode()))
+# The matching adapter keeps storage as ISO-8601 text, so rows written before
+# or after this change are byte-identical; insert sites bind datetimes directly.
+sqlite3.register_adapter(datetime.datetime, datetime.datetime.isoformat)
+
+# Hot-path statements are module constants so every call site hits sqlite's
+# statement cache with the identical string object.
+_SQL_INSERT_EMAIL = """
+    INSERT INTO emails (mail_id, external_id, thread_id, from_name, from_email, "to", "cc", subject, body, received_at, vector_text)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_SQL_INSERT_EMAIL_IGNORE = _SQL_INSERT_EMAIL.replace("INSERT INTO", "INSERT OR IGNORE INTO")
+# Inherits thread_id from the original row, so storing a sent reply needs one
+# statement instead of a SELECT round-trip followed by an INSERT.
+_SQL_INSERT_EMAIL_FROM_ORIGINAL = """
+    INSERT INTO emails (mail_id, external_id, thread_id, from_name, from_email, "to", "cc", subject, body, received_at, vector_text)
+    SELECT ?, NULL, thread_id, ?, ?, ?, ?, ?, ?, ?, ?
+    FROM emails WHERE mail_id = ?
+    RETURNING thread_id
+"""
+_SQL_INSERT_ACTION = """
+    INSERT INTO actions (action_id, mail_id, type, status, payload, result)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+_SQL_INSERT_ACTION_IGNORE = _SQL_INSERT_ACTION.replace("INSERT INTO", "INSERT OR IGNORE INTO")
+_SQL_FETCH_THREAD = "SELECT * FROM emails WHERE thread_id = ? ORDER BY received_at ASC"
+_SQL_COUNT_THREAD = "SELECT COUNT(*) FROM emails WHERE thread_id = ?"
+# emails.thread_id is not unique, so it cannot be a real foreign-key target;
+# the guarded INSERT...SELECT keeps the existence check and the insert in a
+# single statement instead of two round-trips.
+_SQL_INSERT_SUMMARY_GUARDED = """
+    INSERT INTO summaries (summary_id, thread_id, text)
+    SELECT ?, ?, ?
+    WHERE EXISTS (SELECT 1 FROM emails WHERE thread_id = ?)
+"""
+_SQL_UPDATE_ACTION_STATUS = "UPDATE actions SET status = ? WHERE action_id = ?"
+_SQL_UPSERT_ACTION_PREFERENCE = """
+    INSERT INTO action_preferences (
+        preference_id, recipient_email, preference_key, preference_value, source_action_id
+    )
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(recipient_email, preference_key) DO UPDATE SET
+        preference_value = excluded.preference_value,
+        source_action_id = excluded.source_action_id
+"""
+_SQL_UPSERT_GENERAL_PREFERENCE = """
+    INSERT INTO general_preferences (preference_key, preference_value)
+    VALUES (?, ?)
+    ON CONFLICT(preference_key) DO UPDATE SET
+        preference_value = excluded.preference_value
+"""
+
+
+def _locked(method):
+    """Serialize a writer method on the instance's write lock.
+
+    One Database (and its sqlite connection) is shared across request
+    threads, and sqlite transactions are per-connection: without the lock,
+    one thread's commit or rollback would flush or discard another thread's
+    half-finished write batch.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._write_lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
 
 class Database:
     def __init__(
@@ -23,17 +124,65 @@ class Database:
         vector_store: EmailVectorStore | None = None,
         auto_index: bool = True,
         check_same_thread: bool | None = None,
+        pragma_overrides: Dict[str, str] | None = None,
+        index_dir: Path | str | None = None,
     ) -> None:
-        connect_kwargs: Dict[str, Any] = {}
+        connect_kwargs: Dict[str, Any] = {"detect_types": sqlite3.PARSE_DECLTYPES}
         if check_same_thread is not None:
             connect_kwargs["check_same_thread"] = check_same_thread
         self.conn = sqlite3.connect(str(db_path), **connect_kwargs)
         self.conn.row_factory = sqlite3.Row
+        # WAL lets readers proceed while a writer commits, and NORMAL keeps
+        # one fsync per checkpoint instead of per COMMIT. Note WAL adds -wal
+        # and -shm sidecar files next to the database file. Overrides let
+        # tests force e.g. journal_mode=MEMORY.
+        pragmas = {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "temp_store": "MEMORY",
+            "mmap_size": "268435456",
+            "cache_size": "-65536",
+        }
+        if pragma_overrides:
+            pragmas.update(pragma_overrides)
+        self.conn.executescript(
+            "".join(f"PRAGMA {key}={value};\n" for key, value in pragmas.items())
+        )
         self._vector_store = vector_store
         self._auto_index = auto_index
+        # Preference reads are cached per process; any preference write bumps
+        # the version, which invalidates every cached entry at once.
+        self._preference_version = 0
+        self._recipient_pref_cache: Dict[frozenset, tuple[int, Dict[str, List[ActionPreference]]]] = {}
+        self._general_pref_cache: tuple[int, Dict[str, str]] | None = None
+        self._recipients_with_prefs: tuple[int, frozenset[str]] | None = None
+        # Writers serialize on a reentrant lock (transaction() holds it while
+        # the locked single-row helpers run inside). Transaction state lives
+        # per thread so one thread's open transaction can't make another
+        # thread skip its own commit.
+        self._write_lock = threading.RLock()
+        self._tx_state = threading.local()
+        self._db_path = str(db_path)
+        self._read_conn_kwargs = connect_kwargs
+        self._read_conn: sqlite3.Connection | None = None
+        self._index_dir = Path(index_dir) if index_dir is not None else None
         self._create_tables()
+        self._run_migrations()
+        # A persisted index turns warm-restart indexing from O(N encodes)
+        # into encoding only the emails added since the last save.
+        loaded_from_disk = False
+        if (
+            self._vector_store is None
+            and self._index_dir is not None
+            and (self._index_dir / "meta.json").exists()
+        ):
+            self._vector_store = EmailVectorStore.load(self._index_dir)
+            loaded_from_disk = True
         if self._vector_store is not None and self._auto_index:
-            self._initialise_vector_store()
+            if loaded_from_disk:
+                self._sync_vector_store()
+            else:
+                self._initialise_vector_store()
 
     def _create_tables(self) -> None:
         cursor = self.conn.cursor()
@@ -49,7 +198,8 @@ class Database:
                 "cc" JSON,
                 subject TEXT,
                 body TEXT,
-                received_at TIMESTAMP
+                received_at TIMESTAMP,
+                vector_text TEXT
             );
 
             CREATE TABLE IF NOT EXISTS actions (
@@ -83,48 +233,319 @@ class Database:
                 text TEXT NOT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
+
+            -- (thread_id, received_at) serves fetch_emails_for_thread's
+            -- ORDER BY straight from the index, no sort step.
+            CREATE INDEX IF NOT EXISTS idx_emails_thread ON emails(thread_id, received_at);
+            CREATE INDEX IF NOT EXISTS idx_actions_mail ON actions(mail_id);
+            CREATE INDEX IF NOT EXISTS idx_summaries_thread ON summaries(thread_id);
+            CREATE INDEX IF NOT EXISTS idx_prefs_recipient ON action_preferences(recipient_email);
             """
         )
+        # Databases created before the vector_text column existed need it
+        # added; fresh ones get it from the CREATE above.
+        columns = {row["name"] for row in cursor.execute("PRAGMA table_info(emails)")}
+        if "vector_text" not in columns:
+            cursor.execute("ALTER TABLE emails ADD COLUMN vector_text TEXT")
+        self.conn.commit()
+
+    def _run_migrations(self) -> None:
+        """Run one-time data migrations, gated on the stored schema version.
+
+        Databases already at _SCHEMA_VERSION pay a single pragma read here,
+        so per-request Database construction skips the backfill scan.
+        """
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= _SCHEMA_VERSION:
+            return
+        if version < 1:
+            self._backfill_vector_text()
+        self.conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION:d}")
         self.conn.commit()
 
+    def _backfill_vector_text(self) -> None:
+        """One-time fill of vector_text for rows written before the column."""
+        cursor = self.conn.cursor()
+        cursor.arraysize = 1000
+        cursor.execute("SELECT * FROM emails WHERE vector_text IS NULL")
+        updates: List[tuple[str, str]] = []
+        while rows := cursor.fetchmany():
+            for row in rows:
+                email = self._row_to_email(row)
+                updates.append((email_to_text(email), email.mail_id))
+        if updates:
+            with self.conn:
+                self.conn.executemany(
+                    "UPDATE emails SET vector_text = ? WHERE mail_id = ?", updates
+                )
+
+    @contextmanager
+    def transaction(self):
+        """Group several writes into one BEGIN/COMMIT (one fsync total).
+
+        Holds the write lock for the whole span so no other thread's
+        statement or commit can interleave; single-row insert/upsert helpers
+        skip their own commit while a transaction is open.
+        """
+        with self._write_lock:
+            self.conn.execute("BEGIN")
+            self._in_tx = True
+            try:
+                yield
+            except BaseException:
+                self.conn.rollback()
+                raise
+            else:
+                self.conn.commit()
+            finally:
+                self._in_tx = False
+
+    @property
+    def _in_tx(self) -> bool:
+        return getattr(self._tx_state, "active", False)
+
+    @_in_tx.setter
+    def _in_tx(self, value: bool) -> None:
+        self._tx_state.active = value
+
+    def _commit(self) -> None:
+        if not self._in_tx:
+            self.conn.commit()
+
     def _initialise_vector_store(self) -> None:
         if self._vector_store is None:
             return
-        emails = self._load_all_emails()
-        self._vector_store.rebuild(emails)
+        self._vector_store.rebuild_from_iter(self._iter_all_email_texts())
+
+    def _sync_vector_store(self) -> None:
+        """Embed only the emails missing from a loaded index."""
+        if self._vector_store is None:
+            return
+        indexed = self._vector_store.indexed_mail_ids
+        cursor = self.conn.execute("SELECT mail_id FROM emails")
+        missing = [row["mail_id"] for row in cursor.fetchall() if row["mail_id"] not in indexed]
+        # Chunk the IN clause to stay under SQLite's bound-parameter limit.
+        for start in range(0, len(missing), 500):
+            chunk = missing[start : start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = self.conn.execute(
+                f"SELECT * FROM emails WHERE mail_id IN ({placeholders}) ORDER BY received_at ASC",
+                chunk,
+            ).fetchall()
+            self._vector_store.add_emails([self._row_to_email(row) for row in rows])
+
+    def persist_vector_store(self) -> None:
+        """Write the vector index next to the DB so restarts skip re-encoding."""
+        if self._vector_store is not None and self._index_dir is not None:
+            self._vector_store.save(self._index_dir)
+
+    def _iter_all_email_texts(self) -> Iterator[tuple[Dict[str, Any], str]]:
+        """Stream (metadata, embedding text) per email without Email objects.
+
+        Feeds the vector-store rebuild one row at a time so startup memory
+        stays at one encode batch instead of the whole mailbox.
+        """
+        cursor = self.conn.cursor()
+        cursor.arraysize = 1000
+        cursor.execute(
+            'SELECT mail_id, thread_id, subject, body, from_name, from_email, "to", "cc", '
+            "vector_text FROM emails ORDER BY received_at ASC"
+        )
+        while rows := cursor.fetchmany():
+            for row in rows:
+                metadata = {
+                    "mail_id": row["mail_id"],
+                    "thread_id": row["thread_id"],
+                    "subject": row["subject"],
+                    "snippet": _build_snippet(row["body"]),
+                }
+                # vector_text is written on insert; the fallback only fires
+                # for rows that somehow dodged the startup backfill.
+                text = row["vector_text"] or email_fields_to_text(
+                    row["subject"],
+                    row["from_name"],
+                    row["from_email"],
+                    row["to"] or [],
+                    row["cc"] or [],
+                    row["body"],
+                )
+                yield metadata, text
 
     def _load_all_emails(self) -> List[Email]:
         cursor = self.conn.cursor()
+        cursor.arraysize = 1000
         cursor.execute("SELECT * FROM emails ORDER BY received_at ASC")
-        rows = cursor.fetchall()
-        return [self._row_to_email(row) for row in rows]
+        emails: List[Email] = []
+        row_to_email = self._row_to_email
+        while rows := cursor.fetchmany():
+            emails.extend(row_to_email(row) for row in rows)
+        return emails
 
     def fetch_all_emails(self) -> List[Email]:
         return self._load_all_emails()
 
+    @_locked
     def insert_email(self, email: Email) -> None:
         cursor = self.conn.cursor()
         cursor.execute(
-            """
-            INSERT INTO emails (mail_id, external_id, thread_id, from_name, from_email, "to", "cc", subject, body, received_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
+            _SQL_INSERT_EMAIL,
             (
                 email.mail_id,
                 email.external_id,
                 email.thread_id,
                 email.from_name,
                 email.from_email,
-                json.dumps(email.to),
-                json.dumps(email.cc),
+                _dumps(email.to),
+                _dumps(email.cc),
                 email.subject,
                 email.body,
-                email.received_at.isoformat(),
+                email.received_at,
+                email_to_text(email),
             ),
         )
-        self.conn.commit()
+        self._commit()
         self._notify_vector_store(email)
 
+    @_locked
+    def insert_sent_email_from_original(
+        self,
+        original_mail_id: str,
+        *,
+        mail_id: str,
+        from_name: str,
+        from_email: str,
+        to: Sequence[str],
+        cc: Sequence[str],
+        subject: Optional[str],
+        body: str,
+        received_at: datetime.datetime,
+    ) -> Optional[str]:
+        """Store a sent reply on the original email's thread in one statement.
+
+        Returns the thread_id the row landed on, or None when the original
+        mail no longer exists (nothing is inserted in that case).
+        """
+        vector_text = email_fields_to_text(subject, from_name, from_email, to, cc, body)
+        cursor = self.conn.execute(
+            _SQL_INSERT_EMAIL_FROM_ORIGINAL,
+            (
+                mail_id,
+                from_name,
+                from_email,
+                _dumps(to),
+                _dumps(cc),
+                subject,
+                body,
+                received_at,
+                vector_text,
+                original_mail_id,
+            ),
+        )
+        row = cursor.fetchone()
+        self._commit()
+        if row is None:
+            return None
+        thread_id = row["thread_id"]
+        if self._vector_store is not None:
+            # Values were just written verbatim, so skip re-validation.
+            self._notify_vector_store(
+                Email.model_construct(
+                    mail_id=mail_id,
+                    external_id=None,
+                    thread_id=thread_id,
+                    from_name=from_name,
+                    from_email=from_email,
+                    to=list(to),
+                    cc=list(cc),
+                    subject=subject,
+                    body=body,
+                    received_at=received_at,
+                )
+            )
+        return thread_id
+
+    @_locked
+    def bulk_insert_emails(self, emails: Sequence[Email]) -> int:
+        """Insert many emails in one transaction, ignoring duplicates.
+
+        Returns the number of rows actually inserted. A single executemany
+        inside one transaction avoids paying SQLite's per-row commit cost.
+        """
+        if not emails:
+            return 0
+        rows = [
+            (
+                email.mail_id,
+                email.external_id,
+                email.thread_id,
+                email.from_name,
+                email.from_email,
+                _dumps(email.to),
+                _dumps(email.cc),
+                email.subject,
+                email.body,
+                email.received_at,
+                email_to_text(email),
+            )
+            for email in emails
+        ]
+        with self.conn:
+            cursor = self.conn.executemany(
+                _SQL_INSERT_EMAIL_IGNORE,
+                rows,
+            )
+            inserted = cursor.rowcount
+        if self._vector_store is not None:
+            # One add_emails call encodes in batches instead of per email.
+            try:
+                self._vector_store.add_emails(list(emails))
+            except Exception as exc:  # pragma: no cover - defensive
+                logger.exception("Failed to bulk-update vector store: %s", exc)
+        return inserted
+
+    @_locked
+    def bulk_insert_actions(self, actions: Sequence[Action]) -> int:
+        """Insert many actions in one transaction, ignoring duplicates."""
+        if not actions:
+            return 0
+        rows = [
+            (
+                action.action_id,
+                action.mail_id,
+                action.type,
+                action.status,
+                _dumps(action.payload),
+                _dumps(action.result) if action.result else None,
+            )
+            for action in actions
+        ]
+        with self.conn:
+            cursor = self.conn.executemany(
+                _SQL_INSERT_ACTION_IGNORE,
+                rows,
+            )
+            return cursor.rowcount
+
+    @_locked
+    def bulk_insert_summaries(self, summaries: Sequence[Summary]) -> int:
+        """Insert many summaries in one transaction.
+
+        Uses the same guarded statement as insert_summary, so summaries for
+        unknown threads are silently skipped; returns the number of rows
+        actually inserted.
+        """
+        if not summaries:
+            return 0
+        with self.conn:
+            cursor = self.conn.executemany(
+                _SQL_INSERT_SUMMARY_GUARDED,
+                [
+                    (summary.summary_id, summary.thread_id, summary.text, summary.thread_id)
+                    for summary in summaries
+                ],
+            )
+            return cursor.rowcount
+
     def _notify_vector_store(self, email: Email) -> None:
         if self._vector_store is None:
             return
@@ -133,24 +554,41 @@ class Database:
         except Exception as exc:  # pragma: no cover - defensive
             logger.exception("Failed to update vector store for %s: %s", email.mail_id, exc)
 
+    @_locked
     def insert_action(self, action: Action) -> None:
         cursor = self.conn.cursor()
         cursor.execute(
-            """
-            INSERT INTO actions (action_id, mail_id, type, status, payload, result)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """,
+            _SQL_INSERT_ACTION,
             (
                 action.action_id,
                 action.mail_id,
                 action.type,
                 action.status,
-                json.dumps(action.payload),
-                json.dumps(action.result) if action.result else None,
+                _dumps(action.payload),
+                _dumps(action.result) if action.result else None,
             ),
         )
-        self.conn.commit()
+        self._commit()
+
+    @_locked
+    def update_action_status(self, action_id: str, status: str) -> None:
+        """Status-only fast path for the common approve/reject flow."""
+        self.conn.execute(_SQL_UPDATE_ACTION_STATUS, (status, action_id))
+        self._commit()
+
+    @_locked
+    def bulk_update_action_statuses(self, rows: Sequence[tuple[str, str]]) -> None:
+        """Write many (status, action_id) updates with one commit.
+
+        Defers to an enclosing transaction() when one is open, like the
+        single-row helpers.
+        """
+        if not rows:
+            return
+        self.conn.executemany(_SQL_UPDATE_ACTION_STATUS, rows)
+        self._commit()
 
+    @_locked
     def update_action(
         self,
         action_id: str,
@@ -169,11 +607,11 @@ class Database:
 
         if payload is not None:
             updates.append("payload = ?")
-            params.append(json.dumps(payload))
+            params.append(_dumps(payload))
 
         if result is not None:
             updates.append("result = ?")
-            params.append(json.dumps(result))
+            params.append(_dumps(result))
 
         if not updates:
             return
@@ -181,8 +619,9 @@ class Database:
         sql = f"UPDATE actions SET {', '.join(updates)} WHERE action_id = ?"
         params.append(action_id)
         cursor.execute(sql, params)
-        self.conn.commit()
+        self._commit()
 
+    @_locked
     def upsert_action_preference(
         self,
         *,
@@ -193,24 +632,43 @@ class Database:
     ) -> None:
         cursor = self.conn.cursor()
         cursor.execute(
-            """
-            INSERT INTO action_preferences (
-                preference_id, recipient_email, preference_key, preference_value, source_action_id
-            )
-            VALUES (?, ?, ?, ?, ?)
-            ON CONFLICT(recipient_email, preference_key) DO UPDATE SET
-                preference_value = excluded.preference_value,
-                source_action_id = excluded.source_action_id
-            """,
+            _SQL_UPSERT_ACTION_PREFERENCE,
             (
-                str(uuid.uuid4()),
+                uuid.uuid4().hex,
                 recipient_email.lower(),
                 preference_key,
                 preference_value,
                 source_action_id,
             ),
         )
-        self.conn.commit()
+        self._commit()
+        self._preference_version += 1
+
+    @_locked
+    def bulk_upsert_action_preferences(
+        self, rows: Sequence[tuple[str, str, str, Optional[str]]]
+    ) -> None:
+        """Upsert (recipient_email, key, value, source_action_id) rows in one
+        transaction instead of one commit per pair."""
+        if not rows:
+            return
+        # One urandom syscall for all ids instead of one per row. executemany
+        # accepts any iterable, so the id-stamped rows are streamed to it as
+        # a generator rather than materialized into a second list.
+        raw_ids = os.urandom(16 * len(rows))
+        params = (
+            (
+                raw_ids[i * 16 : (i + 1) * 16].hex(),
+                recipient.lower(),
+                key,
+                value,
+                source_action_id,
+            )
+            for i, (recipient, key, value, source_action_id) in enumerate(rows)
+        )
+        with self.conn:
+            self.conn.executemany(_SQL_UPSERT_ACTION_PREFERENCE, params)
+        self._preference_version += 1
 
     def fetch_preferences_for_recipient(self, recipient_email: str) -> List[ActionPreference]:
         cursor = self.conn.cursor()
@@ -230,6 +688,55 @@ class Database:
             for row in rows
         ]
 
+    def fetch_preferences_for_recipients(
+        self, recipient_emails: Sequence[str]
+    ) -> Dict[str, List[ActionPreference]]:
+        """Fetch preferences for several recipients with one IN-clause query."""
+        normalized = [email.lower() for email in recipient_emails]
+        if not normalized:
+            return {}
+
+        cache_key = frozenset(normalized)
+        cached = self._recipient_pref_cache.get(cache_key)
+        if cached is not None and cached[0] == self._preference_version:
+            return cached[1]
+
+        placeholders = ", ".join("?" for _ in normalized)
+        cursor = self.conn.cursor()
+        cursor.execute(
+            f"SELECT * FROM action_preferences WHERE recipient_email IN ({placeholders})",
+            normalized,
+        )
+        grouped: Dict[str, List[ActionPreference]] = {email: [] for email in normalized}
+        for row in cursor.fetchall():
+            grouped[row["recipient_email"]].append(
+                ActionPreference(
+                    preference_id=row["preference_id"],
+                    recipient_email=row["recipient_email"],
+                    preference_key=row["preference_key"],
+                    preference_value=row["preference_value"],
+                    source_action_id=row["source_action_id"],
+                )
+            )
+        self._recipient_pref_cache[cache_key] = (self._preference_version, grouped)
+        return grouped
+
+    @property
+    def recipients_with_prefs(self) -> frozenset[str]:
+        """Recipients that have at least one stored preference.
+
+        Lets callers skip the per-recipient preference query entirely in the
+        common case where no recipient has overrides.
+        """
+        cached = self._recipients_with_prefs
+        if cached is not None and cached[0] == self._preference_version:
+            return cached[1]
+        cursor = self.conn.execute("SELECT DISTINCT recipient_email FROM action_preferences")
+        recipients = frozenset(row["recipient_email"] for row in cursor.fetchall())
+        self._recipients_with_prefs = (self._preference_version, recipients)
+        return recipients
+
+    @_locked
     def upsert_general_preference(
         self,
         *,
@@ -238,46 +745,78 @@ class Database:
     ) -> None:
         cursor = self.conn.cursor()
         cursor.execute(
-            """
-            INSERT INTO general_preferences (preference_key, preference_value)
-            VALUES (?, ?)
-            ON CONFLICT(preference_key) DO UPDATE SET
-                preference_value = excluded.preference_value
-            """,
+            _SQL_UPSERT_GENERAL_PREFERENCE,
             (
                 preference_key,
                 preference_value,
             ),
         )
-        self.conn.commit()
+        self._commit()
+        self._preference_version += 1
+
+    @_locked
+    def bulk_upsert_general_preferences(self, rows: Sequence[tuple[str, str]]) -> None:
+        """Upsert (key, value) general preferences in one transaction."""
+        if not rows:
+            return
+        with self.conn:
+            self.conn.executemany(_SQL_UPSERT_GENERAL_PREFERENCE, rows)
+        self._preference_version += 1
 
     def fetch_general_preferences(self) -> Dict[str, str]:
+        if self._general_pref_cache is not None and self._general_pref_cache[0] == self._preference_version:
+            return self._general_pref_cache[1]
         cursor = self.conn.cursor()
         cursor.execute("SELECT preference_key, preference_value FROM general_preferences")
-        return {row["preference_key"]: row["preference_value"] for row in cursor.fetchall()}
+        preferences = {row["preference_key"]: row["preference_value"] for row in cursor.fetchall()}
+        self._general_pref_cache = (self._preference_version, preferences)
+        return preferences
 
+    @_locked
     def insert_summary(self, summary: Summary) -> None:
         cursor = self.conn.cursor()
         cursor.execute(
-            "SELECT 1 FROM emails WHERE thread_id = ? LIMIT 1",
-            (summary.thread_id,),
+            _SQL_INSERT_SUMMARY_GUARDED,
+            (summary.summary_id, summary.thread_id, summary.text, summary.thread_id),
         )
-        exists = cursor.fetchone()
-        if not exists:
+        if cursor.rowcount == 0:
             raise ValueError(f"Thread {summary.thread_id} does not exist in emails")
+        self._commit()
 
-        cursor.execute(
-            """
-            INSERT INTO summaries (summary_id, thread_id, text)
-            VALUES (?, ?, ?)
-            """,
-            (
-                summary.summary_id,
-                summary.thread_id,
-                summary.text,
-            ),
-        )
-        self.conn.commit()
+    @_locked
+    def commit_email_outputs(
+        self, summary: Summary | None, actions: Sequence[Action]
+    ) -> None:
+        """Persist one email's summary and actions in a single transaction.
+
+        The orchestrator produces up to one summary and two actions per
+        email; writing them together costs one fsync instead of one each.
+        """
+        if summary is None and not actions:
+            return
+        with self.conn:
+            if summary is not None:
+                cursor = self.conn.execute(
+                    _SQL_INSERT_SUMMARY_GUARDED,
+                    (summary.summary_id, summary.thread_id, summary.text, summary.thread_id),
+                )
+                if cursor.rowcount == 0:
+                    raise ValueError(f"Thread {summary.thread_id} does not exist in emails")
+            if actions:
+                self.conn.executemany(
+                    _SQL_INSERT_ACTION,
+                    [
+                        (
+                            action.action_id,
+                            action.mail_id,
+                            action.type,
+                            action.status,
+                            _dumps(action.payload),
+                            _dumps(action.result) if action.result else None,
+                        )
+                        for action in actions
+                    ],
+                )
 
     def fetch_email(self, mail_id: str) -> Optional[Email]:
         cursor = self.conn.cursor()
@@ -288,13 +827,40 @@ class Database:
         return self._row_to_email(row)
 
     def fetch_emails_for_thread(self, thread_id: str) -> List[Email]:
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "SELECT * FROM emails WHERE thread_id = ? ORDER BY received_at ASC",
-            (thread_id,),
-        )
-        rows = cursor.fetchall()
-        return [self._row_to_email(row) for row in rows]
+        cursor = self._reader.cursor()
+        cursor.arraysize = 1000
+        cursor.execute(_SQL_FETCH_THREAD, (thread_id,))
+        emails: List[Email] = []
+        row_to_email = self._row_to_email
+        while rows := cursor.fetchmany():
+            emails.extend(row_to_email(row) for row in rows)
+        return emails
+
+    @property
+    def _reader(self) -> sqlite3.Connection:
+        """Read-only connection for hot-path fetches.
+
+        sqlite3 serializes statements per connection, so under WAL a second
+        read-only handle lets fetch_emails_for_thread run while the writer
+        connection is mid-commit. Falls back to the main connection when a
+        second handle cannot be opened (e.g. in-memory databases).
+        """
+        if self._read_conn is None:
+            try:
+                conn = sqlite3.connect(
+                    f"file:{self._db_path}?mode=ro", uri=True, **self._read_conn_kwargs
+                )
+            except sqlite3.Error:
+                self._read_conn = self.conn
+            else:
+                conn.row_factory = sqlite3.Row
+                self._read_conn = conn
+        return self._read_conn
+
+    def count_emails_in_thread(self, thread_id: str) -> int:
+        """Row count for a thread; an index-only scan, far cheaper than a fetch."""
+        cursor = self._reader.execute(_SQL_COUNT_THREAD, (thread_id,))
+        return cursor.fetchone()[0]
 
     def fetch_thread_by_mail_id(self, mail_id: str) -> List[Email]:
         email = self.fetch_email(mail_id)
@@ -308,13 +874,13 @@ class Database:
         row = cursor.fetchone()
         if not row:
             return None
-        return Action(
+        return Action.model_construct(
             action_id=row["action_id"],
             mail_id=row["mail_id"],
             type=row["type"],
             status=row["status"],
-            payload=json.loads(row["payload"]),
-            result=json.loads(row["result"]) if row["result"] else None,
+            payload=row["payload"],
+            result=row["result"],
         )
 
     def fetch_summary(self, summary_id: str) -> Optional[Summary]:
@@ -323,7 +889,7 @@ class Database:
         row = cursor.fetchone()
         if not row:
             return None
-        return Summary(
+        return Summary.model_construct(
             summary_id=row["summary_id"],
             thread_id=row["thread_id"],
             text=row["text"],
@@ -334,7 +900,7 @@ class Database:
         cursor.execute("SELECT * FROM summaries WHERE thread_id = ?", (thread_id,))
         rows = cursor.fetchall()
         return [
-            Summary(
+            Summary.model_construct(
                 summary_id=row["summary_id"],
                 thread_id=row["thread_id"],
                 text=row["text"],
@@ -344,15 +910,30 @@ class Database:
 
     @staticmethod
     def _row_to_email(row: sqlite3.Row) -> Email:
-        return Email(
+        # "to"/"cc" (JSON) and received_at (TIMESTAMP) arrive already decoded
+        # by the registered converters. Rows were validated on insert, so
+        # model_construct skips re-running pydantic validation per row.
+        return Email.model_construct(
             mail_id=row["mail_id"],
             external_id=row["external_id"],
             thread_id=row["thread_id"],
             from_name=row["from_name"],
             from_email=row["from_email"],
-            to=json.loads(row["to"]) if row["to"] else [],
-            cc=json.loads(row["cc"]) if row["cc"] else [],
+            to=row["to"] or [],
+            cc=row["cc"] or [],
             subject=row["subject"],
             body=row["body"],
-            received_at=datetime.datetime.fromisoformat(row["received_at"]),
+            received_at=row["received_at"],
         )
+
+
+@functools.lru_cache(maxsize=None)
+def get_db(db_path: Path | str = DB_PATH) -> Database:
+    """Process-wide Database per path for scripts sharing one connection.
+
+    Reuses the open connection (and skips re-running the DDL) when several
+    script entry points touch the same file in one process, e.g. the
+    in-process reset_memory flow. Callers that need non-default options
+    (vector stores, check_same_thread) construct Database directly.
+    """
+    return Database(db_path)
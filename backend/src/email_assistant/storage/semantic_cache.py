@@ -0,0 +1,81 @@
+"""Semantic cache backed by a FAISS nearest-neighbor index.
+
+Near-duplicate prompts and search queries are frequent in email triage;
+instead of exact key matching, embed the text and reuse the stored result
+when cosine similarity clears a threshold.
+"""
+from __future__ import annotations
+
+import copy
+from typing import Any, List
+
+import faiss
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from ..logging_utils import logs_handler
+
+logger = logs_handler.get_logger()
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_SIMILARITY_THRESHOLD = 0.92
+IVF_MIGRATION_SIZE = 10_000
+IVF_NLIST = 64
+
+
+class SemanticCache:
+    """Maps embedded text to previously computed results via FAISS row ids."""
+
+    def __init__(
+        self,
+        *,
+        model: SentenceTransformer | None = None,
+        model_name: str = DEFAULT_MODEL,
+        threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+    ) -> None:
+        self.model = model if model is not None else SentenceTransformer(model_name)
+        self.threshold = threshold
+        self.dimension = self.model.get_sentence_embedding_dimension()
+        self._index: faiss.Index = faiss.IndexFlatIP(self.dimension)
+        self._results: List[Any] = []
+        self.hits = 0
+        self.misses = 0
+
+    def _embed(self, text: str) -> np.ndarray:
+        embedding = self.model.encode(
+            [text],
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        return np.asarray(embedding, dtype=np.float32)
+
+    def lookup(self, text: str) -> Any | None:
+        """Return the cached result for the nearest stored text, or None."""
+        if self._index.ntotal == 0:
+            self.misses += 1
+            return None
+        query = self._embed(text)
+        scores, indices = self._index.search(query, 1)
+        score, idx = float(scores[0][0]), int(indices[0][0])
+        if idx < 0 or score < self.threshold:
+            self.misses += 1
+            return None
+        self.hits += 1
+        logger.debug("Semantic cache hit (score=%.3f, hits=%d, misses=%d)", score, self.hits, self.misses)
+        return copy.deepcopy(self._results[idx])
+
+    def store(self, text: str, result: Any) -> None:
+        self._index.add(self._embed(text))
+        self._results.append(copy.deepcopy(result))
+        if isinstance(self._index, faiss.IndexFlatIP) and self._index.ntotal > IVF_MIGRATION_SIZE:
+            self._migrate_to_ivf()
+
+    def _migrate_to_ivf(self) -> None:
+        """Swap the flat index for IVF once the cache is large enough to pay off."""
+        vectors = self._index.reconstruct_n(0, self._index.ntotal)
+        quantizer = faiss.IndexFlatIP(self.dimension)
+        ivf = faiss.IndexIVFFlat(quantizer, self.dimension, IVF_NLIST, faiss.METRIC_INNER_PRODUCT)
+        ivf.train(vectors)
+        ivf.add(vectors)
+        self._index = ivf
+        logger.info("Semantic cache migrated to IVF index (%d entries)", ivf.ntotal)
@@ -1,8 +1,16 @@
 from __future__ import annotations
 
 import json
+import os
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, List, Sequence
+from typing import Any, Iterable, List, Sequence
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
 
 import faiss
 import numpy as np
@@ -10,27 +18,81 @@ from sentence_transformers import SentenceTransformer
 
 from ..business.models import Email
 
+# FAISS scans are OpenMP-parallel but inherit OMP_NUM_THREADS, which is
+# frequently pinned to 1 in Python deployments. Leave one core for the
+# event loop.
+faiss.omp_set_num_threads(max(1, (os.cpu_count() or 2) - 1))
+
 DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_INDEX_TYPE = "hnsw"
 
+# HNSW tuning: M controls graph degree, efConstruction build quality,
+# efSearch the accuracy/latency trade-off at query time.
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+# Below this size a brute-force scan beats the HNSW graph's per-add and
+# per-query overhead, so "hnsw" stores start flat and migrate once.
+HNSW_MIGRATION_THRESHOLD = 1000
 
-def email_to_text(email: Email) -> str:
-    subject = email.subject or "(no subject)"
-    sender = f"{email.from_name} <{email.from_email}>" if email.from_name else email.from_email
-    to_part = ", ".join(email.to) if email.to else "(no recipients)"
-    cc_part = ", ".join(email.cc) if email.cc else "(no cc)"
+QUERY_EMBEDDING_CACHE_SIZE = 512
+
+# IVF-PQ tuning: compresses each vector to IVFPQ_M bytes, trading a little
+# recall for an order-of-magnitude memory cut on large mailboxes. A small
+# exact-rescore head over FP16 copies restores most of the lost recall.
+IVFPQ_NLIST = 256
+IVFPQ_M = 96
+IVFPQ_NBITS = 8
+IVFPQ_NPROBE = 8
+IVFPQ_RERANK_CANDIDATES = 20
+# PQ codebooks have 2**IVFPQ_NBITS centroids per sub-quantizer and faiss
+# refuses to train them on fewer points, so "ivfpq" stores also start flat
+# and migrate once k-means has enough data (~39 points per centroid).
+IVFPQ_MIGRATION_THRESHOLD = 10_000
+
+
+@lru_cache(maxsize=4)
+def _get_model(model_name: str) -> SentenceTransformer:
+    """Load each embedding model once per process; weights are ~90MB."""
+    model = SentenceTransformer(model_name)
+    # Email bodies rarely benefit past 256 tokens; capping the sequence
+    # length bounds tokenizer and transformer work per item.
+    model.max_seq_length = 256
+    return model
+
+
+def email_fields_to_text(
+    subject: str | None,
+    from_name: str | None,
+    from_email: str | None,
+    to: Sequence[str] | None,
+    cc: Sequence[str] | None,
+    body: str | None,
+) -> str:
+    """Build the embedding text from raw fields, without an Email object."""
+    subject = subject or "(no subject)"
+    sender = f"{from_name} <{from_email}>" if from_name else from_email
+    to_part = ", ".join(to) if to else "(no recipients)"
+    cc_part = ", ".join(cc) if cc else "(no cc)"
     lines = [
         f"Subject: {subject}",
         f"From: {sender}",
         f"To: {to_part}",
         f"Cc: {cc_part}",
         "Body:",
-        email.body,
+        body,
     ]
     return '\n'.join(lines)
 
 
-def _build_snippet(email: Email, length: int = 240) -> str:
-    body = (email.body or "").strip().replace("\r\n", " ").replace("\n", " ")
+def email_to_text(email: Email) -> str:
+    return email_fields_to_text(
+        email.subject, email.from_name, email.from_email, email.to, email.cc, email.body
+    )
+
+
+def _build_snippet(body: str | None, length: int = 240) -> str:
+    body = (body or "").strip().replace("\r\n", " ").replace("\n", " ")
     if len(body) <= length:
         return body
     truncated = body[:length]
@@ -41,23 +103,114 @@ def _build_snippet(email: Email, length: int = 240) -> str:
 
 
 class EmailVectorStore:
-    def __init__(self, model_name: str = DEFAULT_MODEL) -> None:
+    def __init__(self, model_name: str = DEFAULT_MODEL, *, index_type: str = DEFAULT_INDEX_TYPE) -> None:
         self.model_name = model_name
-        self.model = SentenceTransformer(model_name)
+        self.index_type = index_type
+        self.model = _get_model(model_name)
         self.dimension = self.model.get_sentence_embedding_dimension()
-        self._index = faiss.IndexFlatIP(self.dimension)
+        self._index = self._new_index()
         self._metadata: List[dict[str, Any]] = []
         self._mail_ids: set[str] = set()
+        self._rerank_vectors: np.ndarray | None = None
+        self._query_cache: OrderedDict[str, np.ndarray] = OrderedDict()
+        # True while backed by a read-only mmap (see load()).
+        self._index_readonly = False
+
+    def _new_index(self) -> faiss.Index:
+        # Embeddings are normalized at insert time, so inner product == cosine
+        # for every index variant.
+        if self.index_type == "flat":
+            return faiss.IndexFlatIP(self.dimension)
+        if self.index_type == "hnsw":
+            # Tiny stores stay flat; add_emails migrates to the graph once
+            # the store outgrows brute force.
+            return faiss.IndexFlatIP(self.dimension)
+        if self.index_type == "ivfpq":
+            # Small stores stay flat; add_emails migrates to IVF-PQ once
+            # there is enough data to train the codebooks.
+            return faiss.IndexFlatIP(self.dimension)
+        if self.index_type == "sq_fp16":
+            # Brute-force scan over FP16 codes: halves the bytes moved per
+            # query, which is what bounds flat search throughput.
+            return faiss.IndexScalarQuantizer(
+                self.dimension, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT
+            )
+        if self.index_type == "sq_int8":
+            # 1 byte per dim (4x smaller than FP32) with SIMD int8 kernels;
+            # recall loss is negligible for normalized MiniLM vectors.
+            # Trained on the first batch via _ensure_trained.
+            return faiss.IndexScalarQuantizer(
+                self.dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+            )
+        raise ValueError(f"Unknown index type: {self.index_type}")
+
+    def _new_hnsw_index(self) -> faiss.Index:
+        index = faiss.IndexHNSWFlat(self.dimension, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+        return index
+
+    def _migrate_to_hnsw(self) -> None:
+        vectors = self._index.reconstruct_n(0, self._index.ntotal)
+        index = self._new_hnsw_index()
+        index.add(vectors)
+        self._index = index
+
+    def _new_ivfpq_index(self, nlist: int) -> faiss.Index:
+        quantizer = faiss.IndexFlatIP(self.dimension)
+        index = faiss.IndexIVFPQ(
+            quantizer, self.dimension, nlist, IVFPQ_M, IVFPQ_NBITS, faiss.METRIC_INNER_PRODUCT
+        )
+        index.nprobe = IVFPQ_NPROBE
+        return index
+
+    def _migrate_to_ivfpq(self) -> None:
+        vectors = self._index.reconstruct_n(0, self._index.ntotal)
+        index = self._new_ivfpq_index(IVFPQ_NLIST)
+        index.train(vectors)
+        index.add(vectors)
+        self._index = index
+
+    def _ensure_trained(self, embeddings: np.ndarray) -> None:
+        # Only sq_int8 still trains lazily (a scalar quantizer needs just a
+        # handful of points); IVF-PQ is trained at migration time instead.
+        if self._index.is_trained:
+            return
+        self._index.train(embeddings)
 
     def clear(self) -> None:
-        self._index = faiss.IndexFlatIP(self.dimension)
+        self._index = self._new_index()
+        self._index_readonly = False
         self._metadata.clear()
         self._mail_ids.clear()
+        self._rerank_vectors = None
 
     def rebuild(self, emails: Sequence[Email]) -> None:
         self.clear()
         self.add_emails(emails)
 
+    def rebuild_from_iter(
+        self, rows: Iterable[tuple[dict[str, Any], str]], batch_size: int = 256
+    ) -> None:
+        """Rebuild from streamed (metadata, text) pairs.
+
+        Lets callers feed raw DB rows without materializing Email objects,
+        keeping peak memory at one batch rather than the whole mailbox.
+        """
+        self.clear()
+        records: list[dict[str, Any]] = []
+        texts: list[str] = []
+        for metadata, text in rows:
+            if metadata["mail_id"] in self._mail_ids:
+                continue
+            records.append(metadata)
+            texts.append(text)
+            if len(texts) >= batch_size:
+                self._add_batch(records, texts)
+                records, texts = [], []
+        if texts:
+            self._add_batch(records, texts)
+
     def add_emails(self, emails: Sequence[Email]) -> None:
         new_records: list[dict[str, Any]] = []
         texts: list[str] = []
@@ -70,42 +223,89 @@ class EmailVectorStore:
                     "mail_id": email.mail_id,
                     "thread_id": email.thread_id,
                     "subject": email.subject,
-                    "snippet": _build_snippet(email),
+                    "snippet": _build_snippet(email.body),
                 }
             )
 
         if not texts:
             return
+        self._add_batch(new_records, texts)
 
+    def _add_batch(self, records: list[dict[str, Any]], texts: list[str]) -> None:
+        if self._index_readonly:
+            # The mmap'd index cannot be mutated; materialize it in memory
+            # once, on the first write after load.
+            self._index = faiss.clone_index(self._index)
+            self._index_readonly = False
         embeddings = self.model.encode(
             texts,
             batch_size=64,
             show_progress_bar=False,
             normalize_embeddings=True,
+            convert_to_numpy=True,
+            convert_to_tensor=False,
         )
         if not isinstance(embeddings, np.ndarray):
             embeddings = np.asarray(embeddings, dtype=np.float32)
-        embeddings = embeddings.astype(np.float32)
+        # MiniLM already emits FP32; casting unconditionally would copy the
+        # whole (N, 384) buffer for nothing.
+        if embeddings.dtype != np.float32:
+            embeddings = embeddings.astype(np.float32, copy=False)
+        self._ensure_trained(embeddings)
         self._index.add(embeddings)
-        for record in new_records:
+        if (
+            self.index_type == "hnsw"
+            and isinstance(self._index, faiss.IndexFlatIP)
+            and self._index.ntotal >= HNSW_MIGRATION_THRESHOLD
+        ):
+            self._migrate_to_hnsw()
+        if (
+            self.index_type == "ivfpq"
+            and isinstance(self._index, faiss.IndexFlatIP)
+            and self._index.ntotal >= IVFPQ_MIGRATION_THRESHOLD
+        ):
+            self._migrate_to_ivfpq()
+        if self.index_type == "ivfpq":
+            # The buffer is only usable when row i holds the vector behind
+            # index id i for the WHOLE index; if it can't cover every id
+            # (e.g. a store loaded without its rerank file), reranking is
+            # disabled rather than rescoring old ids against wrong rows.
+            fp16 = embeddings.astype(np.float16)
+            if self._rerank_vectors is None:
+                if self._index.ntotal == embeddings.shape[0]:
+                    self._rerank_vectors = fp16
+            elif len(self._rerank_vectors) + embeddings.shape[0] == self._index.ntotal:
+                self._rerank_vectors = np.vstack([self._rerank_vectors, fp16])
+            else:
+                self._rerank_vectors = None
+        for record in records:
             self._metadata.append(record)
             self._mail_ids.add(record["mail_id"])
 
     def add_email(self, email: Email) -> None:
         self.add_emails([email])
 
+    @property
+    def indexed_mail_ids(self) -> set[str]:
+        """Mail ids currently present in the index."""
+        return self._mail_ids
+
     def search(self, query: str, limit: int = 5) -> list[dict[str, Any]]:
         normalized = query.strip()
         if not normalized or self._index.ntotal == 0:
             return []
 
-        query_embedding = self.model.encode(
-            [normalized],
-            normalize_embeddings=True,
-            show_progress_bar=False,
-        ).astype(np.float32)
-        k = min(limit, self._index.ntotal)
-        distances, indices = self._index.search(query_embedding, k)
+        query_embedding = self._encode_query(normalized)
+        if (
+            self.index_type == "ivfpq"
+            and not isinstance(self._index, faiss.IndexFlatIP)
+            and self._rerank_vectors is not None
+            and len(self._rerank_vectors) == self._index.ntotal
+        ):
+            distances, indices = self._search_with_rerank(query_embedding, limit)
+        else:
+            k = min(limit, self._index.ntotal)
+            distances, indices = self._index.search(query_embedding, k)
         results: list[dict[str, Any]] = []
         for score, idx in zip(distances[0], indices[0]):
             if idx < 0:
@@ -115,18 +315,62 @@ class EmailVectorStore:
             results.append(metadata)
         return results
 
+    def _encode_query(self, normalized: str) -> np.ndarray:
+        """Encode a query, memoizing repeated searches (LRU, 512 entries)."""
+        cached = self._query_cache.get(normalized)
+        if cached is not None:
+            self._query_cache.move_to_end(normalized)
+            return cached
+        embedding = self.model.encode(
+            [normalized],
+            normalize_embeddings=True,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+        )
+        # MiniLM already emits FP32; only copy if a model ever deviates.
+        if embedding.dtype != np.float32:
+            embedding = embedding.astype(np.float32)
+        self._query_cache[normalized] = embedding
+        if len(self._query_cache) > QUERY_EMBEDDING_CACHE_SIZE:
+            self._query_cache.popitem(last=False)
+        return embedding
+
+    def _search_with_rerank(
+        self, query_embedding: np.ndarray, limit: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Re-score the top IVF-PQ candidates with exact cosine over FP16 copies."""
+        k = min(max(limit, IVFPQ_RERANK_CANDIDATES), self._index.ntotal)
+        _, candidate_ids = self._index.search(query_embedding, k)
+        candidates = candidate_ids[0][candidate_ids[0] >= 0]
+        if candidates.size == 0:
+            return np.empty((1, 0), dtype=np.float32), np.empty((1, 0), dtype=np.int64)
+        exact = self._rerank_vectors[candidates].astype(np.float32) @ query_embedding[0]
+        order = np.argsort(-exact)[:limit]
+        return exact[order][None, :], candidates[order][None, :]
+
     def save(self, out_dir: str | Path) -> None:
         destination = Path(out_dir)
         destination.mkdir(parents=True, exist_ok=True)
         faiss.write_index(self._index, str(destination / "vectors.faiss"))
+        # The rerank buffer must survive restarts: without it a reloaded
+        # ivfpq store could only seed the buffer with post-load batches,
+        # misaligning buffer rows and index ids.
+        if self._rerank_vectors is not None:
+            np.save(str(destination / "rerank.npy"), self._rerank_vectors)
         payload = {
             "model_name": self.model_name,
+            "index_type": self.index_type,
             "records": self._metadata,
         }
-        (destination / "meta.json").write_text(
-            json.dumps(payload, ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
+        if orjson is not None:
+            (destination / "meta.json").write_bytes(
+                orjson.dumps(payload, option=orjson.OPT_INDENT_2)
+            )
+        else:
+            (destination / "meta.json").write_text(
+                json.dumps(payload, ensure_ascii=False, indent=2),
+                encoding="utf-8",
+            )
 
     @classmethod
     def load(cls, index_dir: str | Path, model_name: str | None = None) -> "EmailVectorStore":
@@ -136,11 +380,21 @@ class EmailVectorStore:
         if not meta_path.exists() or not vector_path.exists():
             raise FileNotFoundError(f"Missing index files in {index_path}")
 
-        payload = json.loads(meta_path.read_text(encoding="utf-8"))
+        meta_bytes = meta_path.read_bytes()
+        payload = orjson.loads(meta_bytes) if orjson is not None else json.loads(meta_bytes)
         chosen_model = model_name or payload.get("model_name", DEFAULT_MODEL)
 
-        store = cls(model_name=chosen_model)
-        store._index = faiss.read_index(str(vector_path))
+        # Indexes persisted before index types existed were flat.
+        store = cls(model_name=chosen_model, index_type=payload.get("index_type", "flat"))
+        # Demand-paged mmap keeps startup RSS near zero; only the vectors a
+        # query touches get paged in. Writes clone to memory first.
+        store._index = faiss.read_index(
+            str(vector_path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+        )
+        store._index_readonly = True
         store._metadata = payload.get("records", [])
         store._mail_ids = {record["mail_id"] for record in store._metadata if "mail_id" in record}
+        rerank_path = index_path / "rerank.npy"
+        if store.index_type == "ivfpq" and rerank_path.exists():
+            store._rerank_vectors = np.load(str(rerank_path))
         return store
@@ -1,33 +1,56 @@
 """User-facing helpers to review proposed actions."""
 from __future__ import annotations
 
-import copy
 import datetime
+import functools
 import json
 import logging
 import os
+import re
+import sys
 import uuid
 from typing import Any, Dict, List, Optional, Tuple
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
 from .agents.preferences import PreferenceExtraction, PreferenceExtractionAgent
-from .business.models import Email, Action
+from .business.models import Action
 from .storage.db import Database
 
 
 logger = logging.getLogger(__name__)
 
 
+def _print_payload(payload: Dict[str, Any]) -> None:
+    if orjson is not None:
+        # orjson hands back UTF-8 bytes; writing them straight to the buffer
+        # skips the str decode/re-encode round-trip print would incur. One
+        # write call keeps the payload and newline in a single flush unit.
+        # Flush the text layer first so anything print()ed beforehand (the
+        # "Current payload:" banner) lands before the raw bytes when stdout
+        # is block-buffered, e.g. piped to a file.
+        sys.stdout.flush()
+        sys.stdout.buffer.write(orjson.dumps(payload, option=orjson.OPT_INDENT_2) + b"\n")
+        sys.stdout.flush()
+    else:
+        print(json.dumps(payload, indent=2))
+
+
 def _prompt_payload_update(default_payload: Dict[str, Any]) -> Dict[str, Any]:
     print("Current payload:")
-    print(json.dumps(default_payload, indent=2))
+    _print_payload(default_payload)
     print("Enter updated payload as JSON (press Enter to keep current):")
+    loads = orjson.loads if orjson is not None else json.loads
     while True:
         user_input = input("> ").strip()
         if not user_input:
             return default_payload
         try:
-            payload = json.loads(user_input)
-        except json.JSONDecodeError as exc:
+            payload = loads(user_input)
+        except ValueError as exc:  # covers both json and orjson decode errors
             print(f"Invalid JSON: {exc}")
             continue
         if not isinstance(payload, dict):
@@ -47,18 +70,38 @@ def _prompt_apply_to_general() -> bool:
 
 
 def approve_action(action: Action, db: Database) -> Action:
-    db.update_action(action.action_id, status="executed")
-    action.status = "executed"
-    _store_sent_email(action=action, db=db, payload=action.payload or {})
+    # Status update and sent-email insert land in one commit.
+    with db.transaction():
+        db.update_action_status(action.action_id, "executed")
+        action.status = "executed"
+        _store_sent_email(action=action, db=db, payload=action.payload)
     return action
 
 
 def reject_action(action: Action, db: Database) -> Action:
-    db.update_action(action.action_id, status="rejected")
+    db.update_action_status(action.action_id, "rejected")
     action.status = "rejected"
     return action
 
 
+def approve_actions(actions: List[Action], db: Database) -> List[Action]:
+    """Approve a whole queue at once: one status write for every action."""
+    with db.transaction():
+        db.bulk_update_action_statuses([("executed", action.action_id) for action in actions])
+        for action in actions:
+            action.status = "executed"
+            _store_sent_email(action=action, db=db, payload=action.payload)
+    return actions
+
+
+def reject_actions(actions: List[Action], db: Database) -> List[Action]:
+    """Reject a whole queue at once: one status write for every action."""
+    db.bulk_update_action_statuses([("rejected", action.action_id) for action in actions])
+    for action in actions:
+        action.status = "rejected"
+    return actions
+
+
 def modify_action(
     action: Action,
     db: Database,
@@ -68,14 +111,19 @@ def modify_action(
     preference_extractor: PreferenceExtractionAgent | None = None,
     apply_to_general_preferences: bool = False,
 ) -> Action:
-    db.update_action(
-        action_id=action.action_id,
-        status="executed",
-        payload=updated_payload,
-    )
-    action.payload = updated_payload
-    action.status = "executed"
-    _store_sent_email(action=action, db=db, payload=updated_payload)
+    # The action update and sent-email insert share one commit. Preference
+    # recording stays outside the transaction: it starts with an LLM call,
+    # and holding the write lock across that round-trip would block every
+    # other writer for its duration.
+    with db.transaction():
+        db.update_action(
+            action_id=action.action_id,
+            status="executed",
+            payload=updated_payload,
+        )
+        action.payload = updated_payload
+        action.status = "executed"
+        _store_sent_email(action=action, db=db, payload=updated_payload)
     _record_preferences_from_modification(
         action=action,
         db=db,
@@ -86,72 +134,173 @@ def modify_action(
     )
     return action
 
+
+async def modify_actions_async(
+    modifications: List[Tuple[Action, Dict[str, Any], Dict[str, Any]]],
+    db: Database,
+    *,
+    preference_extractor: PreferenceExtractionAgent | None = None,
+    apply_to_general_preferences: bool = False,
+) -> List[Action]:
+    """Apply several (action, original_payload, updated_payload) modifications.
+
+    The preference extractions — the only network-bound step — run
+    concurrently in one batch, and the resulting preference rows are written
+    with a single bulk upsert instead of one commit per modification.
+    """
+    with db.transaction():
+        for action, _, updated_payload in modifications:
+            db.update_action(
+                action_id=action.action_id,
+                status="executed",
+                payload=updated_payload,
+            )
+            action.payload = updated_payload
+            action.status = "executed"
+            _store_sent_email(action=action, db=db, payload=updated_payload)
+
+    if preference_extractor is not None:
+        pending = [
+            (action, original, updated)
+            for action, original, updated in modifications
+            if action.type == "send_email" and original != updated
+        ]
+        if pending:
+            extractions = await preference_extractor.extract_batch_async(
+                [(original, updated) for _, original, updated in pending]
+            )
+            general_rows: List[Tuple[str, str]] = []
+            recipient_rows: List[Tuple[str, str, str, Optional[str]]] = []
+            for (action, _, updated), extraction in zip(pending, extractions):
+                preferences = _dump_preferences(extraction)
+                if not preferences:
+                    continue
+                if apply_to_general_preferences:
+                    general_rows.extend((key, str(value)) for key, value in preferences.items())
+                    continue
+                # Stringify once per key, not once per (recipient, key) pair.
+                pref_items = [(key, str(value)) for key, value in preferences.items()]
+                recipient_rows.extend(
+                    (recipient, key, value, action.action_id)
+                    for recipient in _extract_recipient_emails(updated.get("to"))
+                    for key, value in pref_items
+                )
+            db.bulk_upsert_general_preferences(general_rows)
+            db.bulk_upsert_action_preferences(recipient_rows)
+
+    return [action for action, _, _ in modifications]
+
+
+async def apply_decisions_async(
+    decisions: List[Tuple[Action, str, Optional[Dict[str, Any]]]],
+    db: Database,
+    *,
+    preference_extractor: PreferenceExtractionAgent | None = None,
+    apply_to_general_preferences: bool = False,
+) -> List[Action]:
+    """Apply pre-supplied review decisions without prompting.
+
+    Each decision is an (action, choice, updated_payload) tuple where choice
+    is "approve", "reject" or "modify"; updated_payload is only read for
+    modifications. Approvals and rejections share a single bulk status
+    write, and modifications go through modify_actions_async so their
+    preference extractions run as one batch.
+    """
+    status_rows: List[Tuple[str, str]] = []
+    approved: List[Action] = []
+    modifications: List[Tuple[Action, Dict[str, Any], Dict[str, Any]]] = []
+    for action, choice, updated_payload in decisions:
+        if choice == "approve":
+            action.status = "executed"
+            status_rows.append(("executed", action.action_id))
+            approved.append(action)
+        elif choice == "reject":
+            action.status = "rejected"
+            status_rows.append(("rejected", action.action_id))
+        elif choice == "modify":
+            modifications.append(
+                (
+                    action,
+                    action.payload,
+                    updated_payload if updated_payload is not None else action.payload,
+                )
+            )
+        else:
+            raise ValueError(f"Unknown review choice {choice!r} for action {action.action_id}")
+
+    db.bulk_update_action_statuses(status_rows)
+    for action in approved:
+        _store_sent_email(action=action, db=db, payload=action.payload)
+    if modifications:
+        await modify_actions_async(
+            modifications,
+            db,
+            preference_extractor=preference_extractor,
+            apply_to_general_preferences=apply_to_general_preferences,
+        )
+    return [action for action, _, _ in decisions]
+
+
+# Recipients arrive either as a list or as one delimited string. Only
+# commas/semicolons separate recipients; whitespace stays intact so a
+# display-name form like "John Doe <j@x.com>" survives as one entry.
+_RECIPIENT_SPLIT_RE = re.compile(r"[,;]+")
+# Loose address shape, not RFC validation. The explicit character classes
+# keep angle brackets out of the match, so "John Doe <j@x.com>" yields
+# j@x.com rather than a <j@x.com> token the drafting lookup could never hit.
+_ADDR_RE = re.compile(r"[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+")
+
+
 def _normalize_recipients(raw: Any) -> List[str]:
     if not raw:
         return []
     if isinstance(raw, list):
-        candidates = raw
-    else:
-        candidates = str(raw).split(",")
-    normalized: List[str] = []
-    for candidate in candidates:
-        address = str(candidate).strip()
-        if address:
-            normalized.append(address)
-    return normalized
+        return [address for candidate in raw if (address := str(candidate).strip())]
+    return [address for piece in _RECIPIENT_SPLIT_RE.split(str(raw)) if (address := piece.strip())]
 
+@functools.lru_cache(maxsize=1)
 def _resolve_sender_identity() -> Tuple[str, str]:
-    name = os.getenv("USER_EMAIL", "example@example.com")
-    configured_email = os.getenv("USER_NAME", "Adrian")
-    if configured_email:
-        return name, configured_email
+    # Env vars never change within a process, so resolve once per lifetime.
+    name = os.getenv("USER_NAME", "Adrian")
+    email = os.getenv("USER_EMAIL", "example@example.com")
+    return name, email
 
 
 def _store_sent_email(*, action: Action, db: Database, payload: Dict[str, Any]) -> None:
+    # Action's payload validator guarantees a dict, so no re-coercion here.
     if action.type != "send_email":
         return
 
-    payload = payload or {}
-    if not isinstance(payload, dict):
-        logger.warning("Ignoring non-dict payload for action %s", action.action_id)
-        payload = {}
-
     original_mail_id = action.mail_id
     if not original_mail_id:
         return
 
-    original_email = db.fetch_email(original_mail_id)
-    if original_email is None:
-        logger.warning(
-            "Unable to store sent email for action %s: mail %s not found",
-            action.get("action_id"),
-            original_mail_id,
-        )
-        return
-
-    to_recipients = _normalize_recipients(payload.get("to"))
-    cc_recipients = _normalize_recipients(payload.get("cc"))
-    subject = payload.get("subject")
-    body = str(payload.get("body", ""))
     sender_name, sender_email = _resolve_sender_identity()
 
-    sent_email = Email(
-        mail_id=str(uuid.uuid4()),
-        external_id=None,
-        thread_id=original_email.thread_id,
-        from_name=sender_name,
-        from_email=sender_email,
-        to=to_recipients,
-        cc=cc_recipients,
-        subject=subject,
-        body=body,
-        received_at=datetime.datetime.now(datetime.timezone.utc),
-    )
-
+    # One INSERT...SELECT inherits the thread_id from the original row, so
+    # there is no fetch_email round-trip or Email materialization here.
     try:
-        db.insert_email(sent_email)
+        thread_id = db.insert_sent_email_from_original(
+            original_mail_id,
+            mail_id=uuid.uuid4().hex,
+            from_name=sender_name,
+            from_email=sender_email,
+            to=_normalize_recipients(payload.get("to")),
+            cc=_normalize_recipients(payload.get("cc")),
+            subject=payload.get("subject"),
+            body=str(payload.get("body", "")),
+            received_at=datetime.datetime.now(datetime.timezone.utc),
+        )
     except Exception as exc:
         logger.exception("Failed to store sent email for action %s: %s", action.action_id, exc)
+        return
+
+    if thread_id is None:
+        logger.warning(
+            "Unable to store sent email for action %s: mail %s not found",
+            action.action_id,
+            original_mail_id,
+        )
 
 
 
@@ -168,35 +317,52 @@ def _record_preferences_from_modification(
     if action.type != "send_email" or preference_extractor is None:
         return
 
+    # "Edit then cancel" flows hand back the payload untouched; there is
+    # nothing to learn from an identity diff, so skip the extractor call.
+    if original_payload == updated_payload:
+        return
+
     extraction = _extract_preferences_from_modification(
         original_payload=original_payload,
         updated_payload=updated_payload,
         preference_extractor=preference_extractor,
     )
-    preferences = extraction.model_dump(exclude_none=True)
+    preferences = _dump_preferences(extraction)
     if not preferences:
         return
 
     if apply_to_general_preferences:
-        for key, value in preferences.items():
-            db.upsert_general_preference(
-                preference_key=key,
-                preference_value=str(value),
-            )
+        db.bulk_upsert_general_preferences(
+            [(key, str(value)) for key, value in preferences.items()]
+        )
         return
 
     to_recipients = _extract_recipient_emails(updated_payload.get("to"))
     if not to_recipients:
         return
 
-    for recipient in to_recipients:
-        for key, value in preferences.items():
-            db.upsert_action_preference(
-                recipient_email=recipient,
-                preference_key=key,
-                preference_value=str(value),
-                source_action_id=action.action_id,
-            )
+    # Stringify once per key, not once per (recipient, key) pair.
+    pref_items = [(key, str(value)) for key, value in preferences.items()]
+    db.bulk_upsert_action_preferences(
+        [
+            (recipient, key, value, action.action_id)
+            for recipient in to_recipients
+            for key, value in pref_items
+        ]
+    )
+
+
+def _dump_preferences(extraction: PreferenceExtraction) -> Dict[str, Any]:
+    # pydantic v2 keeps field values on the instance __dict__, and this is a
+    # flat model of optional strings, so a direct scan gives the same dict as
+    # model_dump(exclude_none=True) without the serializer dispatch — and
+    # folds the all-None empty check into the same pass.
+    fields = PreferenceExtraction.model_fields
+    return {
+        key: value
+        for key, value in extraction.__dict__.items()
+        if value is not None and key in fields
+    }
 
 
 def _extract_preferences_from_modification(
@@ -212,15 +378,24 @@ def _extract_preferences_from_modification(
 
 
 def _extract_recipient_emails(raw_recipients: Any) -> List[str]:
+    # One findall pass pulls the address-shaped tokens straight out of the
+    # raw string (or joined list), replacing the split-then-filter double
+    # iteration. Dedupe is case-folded and order-preserving: "a@x.com,
+    # A@x.com" would otherwise emit the same (recipient, key) upsert row
+    # twice.
     if not raw_recipients:
         return []
-
-    if isinstance(raw_recipients, list):
-        candidates = raw_recipients
+    if isinstance(raw_recipients, str):
+        text = raw_recipients
     else:
-        candidates = [piece.strip() for piece in str(raw_recipients).split(",")]
-
-    emails = [candidate.lower() for candidate in candidates if candidate]
-    return emails
+        text = ",".join(str(candidate) for candidate in raw_recipients)
+    seen: set[str] = set()
+    recipients: List[str] = []
+    for address in _ADDR_RE.findall(text):
+        lowered = address.lower()
+        if lowered not in seen:
+            seen.add(lowered)
+            recipients.append(lowered)
+    return recipients
 
 